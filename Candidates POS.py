@@ -1,49 +1,28 @@
-from tkinter import messagebox, font as tkfont
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import cm
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from tkinter import messagebox, filedialog
 import tkinter as tk
 import os
+import json
+import multiprocessing
 from datetime import datetime
-import qrcode
-import shutil
-
-EXCEL_FILE = "candidate_list.xlsx"
-TICKET_FOLDER = "Tickets"
-CONFIG_FOLDER = "config"
-os.makedirs(CONFIG_FOLDER, exist_ok=True)
-DATE_TRACK_FILE = os.path.join(CONFIG_FOLDER, "last_ticket_date.txt")
-
-# --- Utility function to pick best font ---
-def pick_preferred_font(root):
-    preferred_fonts = ["Montserrat", "Aptos", "Segoe UI", "Helvetica", "Arial"]
-    available = list(tkfont.families(root))
-    for f in preferred_fonts:
-        if f in available:
-            return f
-    return "TkDefaultFont"
-
-# --- Register Montserrat or Aptos if available ---
-def register_pdf_font():
-    possible_fonts = [
-        ("Montserrat", "C:\\Windows\\Fonts\\Montserrat-Regular.ttf"),
-        ("Aptos", "C:\\Windows\\Fonts\\Aptos.ttf"),
-    ]
-    for name, path in possible_fonts:
-        if os.path.exists(path):
-            pdfmetrics.registerFont(TTFont(name, path))
-            return name
-    # fallback
-    return "Helvetica"
+from time import perf_counter
+from queue_engine import RegistrationDesk, TICKET_FOLDER, STATE_FILE
+from ticket_renderer import TicketRenderPool, register_pdf_font
+from font_cache import pick_preferred_font
+from bulk_import import read_candidates, BulkImportError
+from routing import load_routing_config
+from wait_estimator import eta_from_summary, format_eta
+import metrics
+
+RENDER_POLL_INTERVAL = 100  # ms, how often the Tk loop picks up finished ticket PDFs
+DESK_NAME = "Desk A"  # Change for each reception desk
+DESK_BLOCK_SIZE = 0  # 0 = one shared sequence; e.g. 100 gives each desk its own block (1-100, 101-200, ...)
+PRINT_WAIT_ON_TICKET = True  # print the estimated wait (from the rooms' call times) on each pass
 
 class InterviewCandidatePOS:
     def __init__(self, root):
         self.root = root
         self.root.title("KTech Candidate POS")
-        self.set_window_size(420, 480)
+        self.set_window_size(420, 600)
 
         self.bg_color = "#121217"
         self.fg_color = "#E0E6F1"
@@ -56,9 +35,17 @@ class InterviewCandidatePOS:
 
         self.font_family = pick_preferred_font(root)
         self.pdf_font = register_pdf_font()
-
-        self.today = datetime.now().strftime("%Y-%m-%d")
-        self.check_and_reset_daily()
+        self.renderer = TicketRenderPool(self.pdf_font)
+        self.pending_tickets = {}
+        # Batch mode: passes marked for printing are collected and spooled as one merged PDF
+        self.batch_mode = tk.BooleanVar(value=False)
+        self.batch_tickets = []
+
+        # Entry numbers, the journal and the workbook export live in the queue engine
+        self.desk = RegistrationDesk(DESK_NAME, DESK_BLOCK_SIZE)
+        self.ticket_number = self.desk.ticket_number
+        self.today = self.desk.today
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         self.main_frame = tk.Frame(root, bg=self.bg_color)
         self.main_frame.pack(fill='both', expand=True)
@@ -111,12 +98,35 @@ class InterviewCandidatePOS:
         )
         self.contact_number_entry.grid(row=2, column=1, sticky='ew', pady=5)
 
+        # Role picker, only shown when config/routing.json defines more than one role
+        self.roles = load_routing_config().role_names()
+        self.role_var = tk.StringVar(value=self.roles[0])
+        if len(self.roles) > 1:
+            self.role_label = tk.Label(
+                self.input_frame, text="Role:",
+                bg=self.bg_color, fg=self.fg_color, font=(self.font_family, 12)
+            )
+            self.role_label.grid(row=3, column=0, sticky='w', pady=5)
+            self.role_menu = tk.OptionMenu(self.input_frame, self.role_var, *self.roles)
+            self.role_menu.config(
+                bg=self.entry_bg, fg=self.entry_fg, font=(self.font_family, 12),
+                activebackground=self.button_hover_bg, relief="flat", highlightthickness=0
+            )
+            self.role_menu["menu"].config(bg=self.entry_bg, fg=self.entry_fg, font=(self.font_family, 12))
+            self.role_menu.grid(row=3, column=1, sticky='ew', pady=5)
+
         self.ticket_label = tk.Label(
             self.input_frame, text=f"Entry No: {getattr(self, 'ticket_number', 0)}",
             font=(self.font_family, 22, "bold"), fg=self.accent_color, bg=self.bg_color
         )
         self.ticket_label.grid(row=4, column=0, columnspan=2, pady=20)
 
+        self.status_label = tk.Label(
+            self.input_frame, text="", font=(self.font_family, 10),
+            fg=self.fg_color, bg=self.bg_color, wraplength=360
+        )
+        self.status_label.grid(row=5, column=0, columnspan=2)
+
         self.btn_generate = tk.Button(
             self.button_frame, text="Generate Entry Pass",
             font=(self.font_family, 14, "bold"),
@@ -127,6 +137,35 @@ class InterviewCandidatePOS:
         self.btn_generate.pack(fill='x', pady=8)
         self.add_hover_effect(self.btn_generate, self.button_bg, self.button_hover_bg, self.accent_color, "#121217")
 
+        self.chk_batch = tk.Checkbutton(
+            self.button_frame, text="Batch printing (print passes together)",
+            variable=self.batch_mode, command=self.update_batch_button,
+            font=(self.font_family, 11), bg=self.bg_color, fg=self.fg_color,
+            selectcolor=self.entry_bg, activebackground=self.bg_color, activeforeground=self.accent_color,
+            cursor="hand2"
+        )
+        self.chk_batch.pack(anchor='w')
+
+        self.btn_print_batch = tk.Button(
+            self.button_frame, text="Print Batch (0)",
+            font=(self.font_family, 12, "bold"),
+            bg=self.button_bg, fg=self.accent_color,
+            activebackground=self.button_hover_bg, activeforeground="#121217",
+            relief="flat", command=self.print_batch, cursor="hand2"
+        )
+        self.btn_print_batch.pack(fill='x', pady=(4, 8))
+        self.add_hover_effect(self.btn_print_batch, self.button_bg, self.button_hover_bg, self.accent_color, "#121217")
+
+        self.btn_bulk = tk.Button(
+            self.button_frame, text="Bulk Import List...",
+            font=(self.font_family, 12, "bold"),
+            bg=self.button_bg, fg=self.accent_color,
+            activebackground=self.button_hover_bg, activeforeground="#121217",
+            relief="flat", command=self.bulk_import, cursor="hand2"
+        )
+        self.btn_bulk.pack(fill='x', pady=(0, 8))
+        self.add_hover_effect(self.btn_bulk, self.button_bg, self.button_hover_bg, self.accent_color, "#121217")
+
         self.btn_reset = tk.Button(
             self.button_frame, text="Reset Counter",
             font=(self.font_family, 12, "bold"),
@@ -137,7 +176,7 @@ class InterviewCandidatePOS:
         self.btn_reset.pack(fill='x')
         self.add_hover_effect(self.btn_reset, "#8B0000", "#B22222", "white", "#f0f0f0")
 
-        self.setup_excel()
+        self.poll_renders()
 
     def add_hover_effect(self, widget, bg_normal, bg_hover, fg_normal, fg_hover):
         def on_enter(e):
@@ -159,55 +198,6 @@ class InterviewCandidatePOS:
         self.root.geometry(f"{width}x{height}+{x}+{y}")
         self.root.minsize(400, 450)
 
-    def check_and_reset_daily(self):
-        if not os.path.exists(DATE_TRACK_FILE):
-            with open(DATE_TRACK_FILE, 'w') as f:
-                f.write(self.today)
-            self.ticket_number = 0
-        else:
-            with open(DATE_TRACK_FILE, 'r') as f:
-                last_date = f.read().strip()
-
-            if last_date != self.today:
-                self.ticket_number = 0
-                with open(DATE_TRACK_FILE, 'w') as f:
-                    f.write(self.today)
-                self.reset_excel_file()
-            else:
-                self.ticket_number = self.get_last_ticket_number()
-
-    def reset_excel_file(self):
-        if os.path.exists(EXCEL_FILE):
-            wb = load_workbook(EXCEL_FILE)
-            ws = wb.active
-            ws.delete_rows(2, ws.max_row)
-            wb.save(EXCEL_FILE)
-
-    def get_last_ticket_number(self):
-        if os.path.exists(EXCEL_FILE):
-            wb = load_workbook(EXCEL_FILE)
-            ws = wb.active
-            count = 0
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                if row[0] == self.today:
-                    count += 1
-            return count
-        return 0
-
-    def setup_excel(self):
-        if not os.path.exists(EXCEL_FILE):
-            wb = Workbook()
-            ws = wb.active
-            headers = ["Date", "Day", "Time", "Candidate Name", "Contact Number", "Entry No"]
-            ws.append(headers)
-            for col, header in enumerate(headers, start=1):
-                cell = ws.cell(row=1, column=col)
-                cell.font = Font(bold=True)
-                cell.alignment = Alignment(horizontal='center')
-                cell.fill = PatternFill(start_color="003F5C", end_color="003F5C", fill_type="solid")
-                ws.column_dimensions[chr(64 + col)].width = max(len(header) + 5, 15)
-            wb.save(EXCEL_FILE)
-
     def generate_ticket(self):
         name = self.name_entry.get().strip()
         contact_number = self.contact_number_entry.get().strip()
@@ -218,81 +208,156 @@ class InterviewCandidatePOS:
             messagebox.showwarning("Input Required", "Please enter the contact number.")
             return
 
-        now = datetime.now()
-        date = now.strftime("%Y-%m-%d")
-        day = now.strftime("%A")
-        time = now.strftime("%H:%M:%S")
-        file_time = now.strftime("%H-%M-%S")
+        # With a single role nothing is recorded, so the pass and workbook stay as before
+        role = self.role_var.get() if len(self.roles) > 1 else None
 
-        self.ticket_number += 1
+        # Timed up to the hand-off to the renderer, i.e. the part the operator waits for
+        started = perf_counter()
+        record, pdf_path = self.desk.register(name, contact_number, role)
+        self.ticket_number = record["entry_no"]
         self.ticket_label.config(text=f"Entry No: {self.ticket_number}")
 
-        wb = load_workbook(EXCEL_FILE)
-        ws = wb.active
-        ws.append([date, day, time, name, contact_number, self.ticket_number])
-        new_row = ws.max_row
-        for col in range(1, 7):
-            ws.cell(row=new_row, column=col).alignment = Alignment(horizontal='center')
-        wb.save(EXCEL_FILE)
-
-        folder_name = os.path.join(TICKET_FOLDER, f"{date} - Entries")
-        os.makedirs(folder_name, exist_ok=True)
-        daily_excel_path = os.path.join(folder_name, f"candidate_list_{date}.xlsx")
-        shutil.copy(EXCEL_FILE, daily_excel_path)
-
-        safe_name = name.replace(" ", "_")
-        pdf_filename = f"Entry_{self.ticket_number}_{safe_name}_{file_time}.pdf"
-        pdf_path = os.path.join(folder_name, pdf_filename)
-
-        self.create_ticket_pdf(pdf_path, name, contact_number, self.ticket_number, date, day, time)
+        # The PDF renders in the background; on_ticket_ready fires when it is written
+        ticket = dict(record, wait=self.estimated_wait(self.ticket_number) if PRINT_WAIT_ON_TICKET else None)
+        self.pending_tickets[pdf_path] = {"ready": False, "print": None, "ticket": ticket}
+        self.renderer.submit(pdf_path, ticket, self.on_ticket_ready)
+        metrics.observe("generate_ticket", perf_counter() - started)
 
         self.name_entry.delete(0, tk.END)
         self.contact_number_entry.delete(0, tk.END)
+        self.name_entry.focus_set()
+        self.status_label.config(text=f"Entry No {self.ticket_number} generated for {name}. Preparing pass...")
+
+        wants_print = messagebox.askyesno("Print Entry Pass", f"Do you want to print the pass for Entry No {self.ticket_number} now?")
+        if pdf_path in self.pending_tickets:
+            self.pending_tickets[pdf_path]["print"] = wants_print
+            self.finish_ticket(pdf_path)
+
+    def estimated_wait(self, entry_no):
+        # The rooms publish their call rate in queue_state.json; nothing is printed before the first calls
+        try:
+            with open(STATE_FILE, "r") as f:
+                estimate = json.load(f).get("estimate")
+        except (OSError, ValueError):
+            return None
+        if not estimate or not str(estimate.get("updated")).startswith(self.today):
+            return None
+        return format_eta(eta_from_summary(estimate, entry_no))
+
+    def bulk_import(self):
+        path = filedialog.askopenfilename(
+            title="Select the shortlisted candidates",
+            filetypes=[("Candidate lists", "*.csv *.xlsx"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            candidates = read_candidates(path)
+        except BulkImportError as e:
+            details = "\n".join(e.errors[:15])
+            if len(e.errors) > 15:
+                details += f"\n...and {len(e.errors) - 15} more."
+            messagebox.showerror("Bulk Import", f"{e}\n\n{details}".strip())
+            return
+        except OSError as e:
+            messagebox.showerror("Bulk Import", f"Could not read the file: {e}")
+            return
+
+        if not messagebox.askyesno("Bulk Import", f"Register {len(candidates)} candidates with consecutive entry numbers?"):
+            return
 
-        messagebox.showinfo("Success", f"Entry No {self.ticket_number} generated for {name}.")
-        if messagebox.askyesno("Print Entry Pass", "Do you want to print the pass now?"):
-            try:
-                os.startfile(pdf_path, "print")
-            except Exception as e:
-                messagebox.showerror("Printing Error", f"Could not print ticket: {e}")
+        # Consecutive entry numbers in one counter transaction and one journal write;
+        # passes render on every CPU core
+        records, jobs = self.desk.register_many(candidates)
+        self.ticket_number = self.desk.ticket_number
+        self.ticket_label.config(text=f"Entry No: {self.ticket_number}")
 
-    def create_ticket_pdf(self, filepath, name, contact_number, entry_no, date, day, time):
-        width = 8 * cm
-        height = 8 * cm
-        c = canvas.Canvas(filepath, pagesize=(width, height))
-        qr_text = f"Entry No: {entry_no}\nName: {name}\nContact: {contact_number}\nDate: {date} ({day})\nTime: {time}"
-        qr_img = qrcode.make(qr_text)
-        qr_temp = "temp_qr.png"
-        qr_img.save(qr_temp)
+        self.btn_bulk.config(state='disabled')
+        self.status_label.config(text=f"Registered {len(records)} candidates. Preparing their passes...")
+        self.renderer.submit_parallel(jobs, self.on_bulk_ready)
 
-        c.setFont(self.pdf_font, 16)
-        c.setFillColorRGB(0, 0, 0)
-        c.drawCentredString(width / 2, height - 30, "KTech")
+    def on_bulk_ready(self, _, jobs, error):
+        self.btn_bulk.config(state='normal')
+        if error is not None:
+            messagebox.showerror("Bulk Import", f"Candidates were registered, but creating their passes failed: {error}")
+            return
+        self.status_label.config(text=f"{len(jobs)} passes written to {os.path.dirname(jobs[0][0])}.")
 
-        c.setFont(self.pdf_font, 10)
-        c.drawCentredString(width / 2, height - 50, f"{date} ({day}) | {time}")
+    def poll_renders(self):
+        self.renderer.process_results()
+        self.root.after(RENDER_POLL_INTERVAL, self.poll_renders)
 
-        c.setFont(self.pdf_font, 10)
-        c.drawString(20, height - 80, f"Name: {name}")
-        c.drawString(20, height - 110, f"Number: {contact_number}")
-        c.drawString(20, height - 140, f"Entry No: {entry_no}")
+    def on_ticket_ready(self, pdf_path, ticket, error):
+        if error is not None:
+            self.pending_tickets.pop(pdf_path, None)
+            messagebox.showerror("Ticket Error", f"Could not create the pass for Entry No {ticket['entry_no']}: {error}")
+            return
+        self.status_label.config(text=f"Pass for Entry No {ticket['entry_no']} ({ticket['name']}) is ready.")
+        if pdf_path in self.pending_tickets:
+            self.pending_tickets[pdf_path]["ready"] = True
+            self.finish_ticket(pdf_path)
+
+    def finish_ticket(self, pdf_path):
+        # Prints once both the PDF is written and the operator has answered the print question
+        pending = self.pending_tickets[pdf_path]
+        if not pending["ready"] or pending["print"] is None:
+            return
+        del self.pending_tickets[pdf_path]
+        if pending["print"]:
+            if self.batch_mode.get():
+                self.batch_tickets.append(pending["ticket"])
+                self.update_batch_button()
+            else:
+                self.print_ticket(pdf_path)
 
-        c.drawImage(qr_temp, width - 90, 20, width=70, height=70)
+    def update_batch_button(self):
+        self.btn_print_batch.config(text=f"Print Batch ({len(self.batch_tickets)})")
 
-        c.setFont(self.pdf_font, 8)
-        c.drawCentredString(width / 2, 10, "Scan for interview info")
+    def print_batch(self):
+        if not self.batch_tickets:
+            messagebox.showinfo("Print Batch", "No passes are waiting to be printed.")
+            return
+        tickets, self.batch_tickets = self.batch_tickets, []
+        self.update_batch_button()
+        now = datetime.now()
+        folder_name = os.path.join(TICKET_FOLDER, f"{now.strftime('%Y-%m-%d')} - Entries")
+        os.makedirs(folder_name, exist_ok=True)
+        first, last = tickets[0]["entry_no"], tickets[-1]["entry_no"]
+        pdf_path = os.path.join(folder_name, f"Batch_{first}-{last}_{now.strftime('%H-%M-%S')}.pdf")
+        self.status_label.config(text=f"Preparing {len(tickets)} passes for printing...")
+        self.renderer.submit_batch(pdf_path, tickets, self.on_batch_ready)
+
+    def on_batch_ready(self, pdf_path, tickets, error):
+        if error is not None:
+            # Put them back so the operator can retry
+            self.batch_tickets = tickets + self.batch_tickets
+            self.update_batch_button()
+            messagebox.showerror("Printing Error", f"Could not create the batch: {error}")
+            return
+        self.status_label.config(text=f"Sent {len(tickets)} passes to the printer.")
+        self.print_ticket(pdf_path)
 
-        c.showPage()
-        c.save()
-        os.remove(qr_temp)
+    def print_ticket(self, pdf_path):
+        try:
+            os.startfile(pdf_path, "print")
+        except Exception as e:
+            messagebox.showerror("Printing Error", f"Could not print ticket: {e}")
 
     def reset_counter(self):
         if messagebox.askyesno("Confirm Reset", "Are you sure you want to reset the entry number?"):
+            self.desk.reset()
             self.ticket_number = 0
             self.ticket_label.config(text="Entry No: 0")
-            self.reset_excel_file()
+
+    def on_close(self):
+        # Make sure the last passes and registrations are written before exiting
+        self.renderer.close()
+        self.desk.close()
+        self.root.destroy()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    metrics.configure("pos", DESK_NAME)
     root = tk.Tk()
     root.configure(bg="#121217")
     app = InterviewCandidatePOS(root)
@@ -1,17 +1,22 @@
 import tkinter as tk
 from tkinter import ttk
-import json
 import os
+import time
 from datetime import datetime
 import platform
+from change_notify import ChangeListener, TOPIC_QUEUE
+from queue_engine import read_state_file, board_rows, upcoming_tokens, STATE_FILE
+from wait_estimator import format_eta, parse_timestamp
+import metrics
 
 # Only for Windows sound
 if platform.system() == "Windows":
     import winsound
 
-STATE_FILE = "queue_state.json"
 SOUND_FILE = "dip_config/notify.wav"  # Ensure this file exists
-REFRESH_INTERVAL = 3000  # milliseconds
+REFRESH_INTERVAL = 3000  # milliseconds, polling when change notifications are unavailable
+FALLBACK_INTERVAL = 15000  # milliseconds, safety polling while change notifications are active
+WATCH_INTERVAL = 100  # milliseconds, how often the Tk loop checks for a change notification
 
 # Colors for dark theme with contrast
 BG_COLOR = "#1e1e1e"        # Dark gray background
@@ -65,7 +70,14 @@ class CentralDisplayApp:
         self.tree.column("Name", anchor="center", width=500)
         self.tree.column("Room", anchor="center", width=300)
 
-        self.tree.pack(pady=40, expand=True, fill='both')
+        self.tree.pack(pady=(40, 10), expand=True, fill='both')
+
+        # Next waiting tokens with their estimated wait, counted down between calls
+        self.upcoming_label = tk.Label(root, text="", font=("Arial", 20, "bold"),
+                                       bg=BG_COLOR, fg=FG_COLOR, wraplength=1200)
+        self.upcoming_label.pack(pady=(0, 20))
+        self.upcoming = []
+        self.estimate_time = None
 
         # Style the treeview
         style = ttk.Style()
@@ -88,7 +100,16 @@ class CentralDisplayApp:
         self.tree.tag_configure('evenrow', background=ROW_COLOR_2, foreground=FG_COLOR)
         self.tree.tag_configure('blink', background=SELECT_BG_COLOR, foreground=SELECT_FG_COLOR)
 
+        # Per-room row index: counter -> {"row_id", "token", "name"}
         self.previous_data = {}
+        self.state_stat = None
+
+        # Room calls wake the board straight away; polling is only a fallback
+        self.listener = ChangeListener([TOPIC_QUEUE])
+        self.poll_interval = FALLBACK_INTERVAL if self.listener.start() else REFRESH_INTERVAL
+        self.seen_version = self.listener.version
+        self.next_poll = 0
+
         self.update_time()
         self.refresh_data()
 
@@ -101,44 +122,89 @@ class CentralDisplayApp:
     def update_time(self):
         now = datetime.now().strftime("%A, %d %B %Y  |  %I:%M:%S %p")
         self.time_label.config(text=now)
+        self.update_upcoming()
         self.root.after(1000, self.update_time)
 
-    def refresh_data(self):
-        self.tree.delete(*self.tree.get_children())
-        latest_data = {}
-
-        if os.path.exists(STATE_FILE):
-            with open(STATE_FILE, "r") as f:
-                state = json.load(f)
-
-            latest_per_counter = {}
-            for item in state.get("called_tokens", []):
-                latest_per_counter[item["counter"]] = item
+    def update_upcoming(self):
+        if not self.upcoming:
+            self.upcoming_label.config(text="")
+            return
+        elapsed = max(0, time.time() - self.estimate_time) if self.estimate_time else 0
+        parts = [f"{item['token']} ({format_eta(max(0, item['eta_seconds'] - elapsed))})" for item in self.upcoming]
+        self.upcoming_label.config(text="Up next:  " + "   ·   ".join(parts))
 
-            # Sort to show most recent token first
-            sorted_items = sorted(
-                latest_per_counter.items(),
-                key=lambda x: x[1].get("timestamp", ""),
-                reverse=True
-            )
-
-            for i, (counter, entry) in enumerate(sorted_items):
-                token = entry["token"]
-                name = entry["name"]
-                latest_data[counter] = token
+    def read_state(self):
+        # Returns None when queue_state.json is unchanged since the last read
+        self.state_stat, state = read_state_file(STATE_FILE, self.state_stat)
+        return state
 
+    def refresh_data(self):
+        now = time.monotonic()
+        if self.listener.version != self.seen_version or now >= self.next_poll:
+            self.seen_version = self.listener.version
+            self.next_poll = now + self.poll_interval / 1000
+            start = time.perf_counter()
+            state = self.read_state()
+            if state is not None:
+                self.apply_state(state)
+                metrics.observe("display_refresh", time.perf_counter() - start)
+        self.root.after(WATCH_INTERVAL, self.refresh_data)
+
+    def apply_state(self, state):
+        estimate, self.upcoming = upcoming_tokens(state)
+        self.estimate_time = parse_timestamp(estimate.get("updated"))
+        self.update_upcoming()
+
+        # Latest token per room, most recent first
+        sorted_items = [(entry["counter"], entry) for entry in board_rows(state)]
+        latest_per_counter = dict(sorted_items)
+
+        # Rooms that disappeared (queue reset) lose their row
+        for counter in list(self.previous_data):
+            if counter not in latest_per_counter:
+                self.tree.delete(self.previous_data.pop(counter)["row_id"])
+
+        # Only rows whose room/token pair changed are touched, so the board doesn't flicker
+        for i, (counter, entry) in enumerate(sorted_items):
+            token = entry["token"]
+            name = entry["name"]
+            row = self.previous_data.get(counter)
+
+            if row is None:
                 tag = 'evenrow' if i % 2 == 0 else 'oddrow'
-                row_id = self.tree.insert("", "end", values=(token, name, counter), tags=(tag,))
-
-                # If token changed, play sound + blink
-                if counter not in self.previous_data or self.previous_data[counter] != token:
-                    self.blink_row(row_id, 0)
-                    self.play_sound()
-
-        self.previous_data = latest_data
-        self.root.after(REFRESH_INTERVAL, self.refresh_data)
+                row_id = self.tree.insert("", i, values=(token, name, counter), tags=(tag,))
+                self.previous_data[counter] = {"row_id": row_id, "token": token, "name": name}
+                changed = True
+            else:
+                row_id = row["row_id"]
+                if self.tree.index(row_id) != i:
+                    self.tree.move(row_id, "", i)
+                changed = row["token"] != token or row["name"] != name
+                if changed:
+                    self.tree.item(row_id, values=(token, name, counter))
+                    row["token"] = token
+                    row["name"] = name
+
+            # If token changed, play sound + blink
+            if changed:
+                self.blink_row(row_id, 0)
+                self.play_sound()
+
+        self.restripe_rows()
+
+    def restripe_rows(self):
+        # Keep alternating colours correct after moves; rows mid-blink restore their own tag
+        for index, row_id in enumerate(self.tree.get_children()):
+            tags = self.tree.item(row_id, "tags")
+            if "blink" in tags:
+                continue
+            stripe = 'evenrow' if index % 2 == 0 else 'oddrow'
+            if tuple(tags) != (stripe,):
+                self.tree.item(row_id, tags=(stripe,))
 
     def blink_row(self, row_id, count):
+        if not self.tree.exists(row_id):
+            return
         if count < 6:
             tags = self.tree.item(row_id, "tags")
 
@@ -179,6 +245,7 @@ class CentralDisplayApp:
 
 
 if __name__ == "__main__":
+    metrics.configure("display")
     root = tk.Tk()
     app = CentralDisplayApp(root)
     root.mainloop()
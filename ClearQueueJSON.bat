@@ -1,16 +1,31 @@
 @echo off
-set FILE=queue_state.json
+:: End of day: moves the called tokens to Archive\<date>\queue_events.jsonl and starts the queue over.
+:: The Interview Room apps and the Central Display can stay open, they pick up the reset by themselves.
+:: Runs "python queue_store.py" where Python and the .py files are installed, otherwise the packaged
+:: room app with --archive, so PCs with only the .exe files need nothing else.
 
-:: Delete the file if it exists
-if exist "%FILE%" del "%FILE%"
+set USE_PYTHON=
+if exist "queue_store.py" (
+    where python >nul 2>nul && set USE_PYTHON=1
+)
+set ROOM_EXE=
+if exist "Interview Rooms.exe" set "ROOM_EXE=Interview Rooms.exe"
+if exist "Interview Room 2.exe" set "ROOM_EXE=Interview Room 2.exe"
+if exist "Interview Room 1.exe" set "ROOM_EXE=Interview Room 1.exe"
 
-:: Create a new file with default JSON
-(
-echo {
-echo     "queue": [],
-echo     "called_tokens": []
-echo }
-) > "%FILE%"
+if defined USE_PYTHON (
+    python queue_store.py --include-today
+) else if defined ROOM_EXE (
+    start "" /wait "%ROOM_EXE%" --archive
+) else (
+    echo Nothing to archive with: put this file next to "Interview Room 1.exe", or install Python.
+    goto end
+)
+if errorlevel 1 (
+    echo Archiving failed, queue_state.db was left unchanged.
+) else (
+    echo queue_state.db and queue_state.json have been reset successfully.
+)
 
-echo %FILE% has been reset successfully.
+:end
 pause
@@ -0,0 +1,8 @@
+import sys
+from room_controller import main
+
+# Hosts every room listed on the command line, in config/rooms.json, or Room 1 and Room 2 by default
+#   python "Interview Rooms.py" "Room 1" "Room 2" "Room 3"
+#   python "Interview Rooms.py" --count 4
+if __name__ == "__main__":
+    main(sys.argv[1:])
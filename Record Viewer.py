@@ -1,65 +1,624 @@
-from flask import Flask, render_template_string
-from openpyxl import load_workbook
+from flask import Flask, Response, jsonify, request, stream_with_context
 from datetime import datetime
+from html import escape
+from urllib.parse import urlencode
 import os
+import math
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from bisect import bisect_left, bisect_right
+from app_files import EXCEL_FILE, STATE_FILE, STATE_DB, today_str
+from change_notify import ChangeListener, TOPIC_WORKBOOK, TOPIC_QUEUE
+from wait_estimator import WaitEstimator, format_eta
+from history_store import HistoryStore, DEFAULT_DAYS
+from analytics import QueueAnalytics, DEFAULT_DAYS as ANALYTICS_DAYS, GAP_BUCKETS, minutes_text
+import metrics
 
 app = Flask(__name__)
 
-EXCEL_PATH = "candidate_list.xlsx"
+KEEPALIVE_SECONDS = 15
+PER_PAGE_CHOICES = [50, 100, 250, 500]
+DEFAULT_PER_PAGE = 100
+PAGE_CACHE_SIZE = 64
+STREAM_CHUNK_ROWS = 500  # rows per piece of the streamed full list
+ANALYTICS_POLL_SECONDS = 5  # analytics catch-up interval when change notifications are unavailable
+
+# Tells open pages as soon as the POS re-exports the workbook or a room calls a token.
+# Started with the server (start_background), not on import: the benchmarks load this file too.
+listener = ChangeListener([TOPIC_WORKBOOK, TOPIC_QUEUE])
+
+def load_rows(filepath):
+    from openpyxl import load_workbook
+    wb = load_workbook(filepath, read_only=True, data_only=True)
+    ws = wb.active
+    rows = [tuple(row) for row in ws.iter_rows(values_only=True)]
+    wb.close()
+    return rows
+
+def iter_sheet_rows(filepath):
+    # Read-only mode parses the sheet as it goes, so only the current rows are in memory. It reads a copy:
+    # the POS replaces the workbook on every export, which Windows refuses while the file is open.
+    from openpyxl import load_workbook
+    fd, copy_path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        shutil.copyfile(filepath, copy_path)
+        wb = load_workbook(copy_path, read_only=True, data_only=True)
+        try:
+            yield from wb.active.iter_rows(values_only=True)
+        finally:
+            wb.close()
+    finally:
+        os.remove(copy_path)
 
 def excel_to_html(filepath):
     if not os.path.exists(filepath):
         return "<p style='color:#ffdede'>Excel file not found.</p>"
+    return rows_to_html(load_rows(filepath))
 
-    wb = load_workbook(filepath, data_only=True)
-    ws = wb.active
+def rows_to_html(rows):
+    return "".join(iter_table_html(rows))
 
-    rows = list(ws.rows)
-    if not rows:
-        return "<p style='color:#ffdede'>No data found in Excel.</p>"
+def iter_table_html(rows, chunk_rows=STREAM_CHUNK_ROWS):
+    # rows: any iterable, header first; the table comes out in pieces of chunk_rows rows
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        yield "<p style='color:#ffdede'>No data found in Excel.</p>"
+        return
 
     # Build table with semantic classes for styling
-    html = '<table class="candidate-table" role="table">'
-    # Header
-    html += '<thead><tr>'
-    for cell in rows[0]:
-        v = cell.value if cell.value is not None else ""
-        html += f'<th scope="col">{v}</th>'
-    html += '</tr></thead>'
-
-    # Body
-    html += '<tbody>'
-    for i, row in enumerate(rows[1:]):
+    head = "".join(f'<th scope="col">{escape(cell_text(value))}</th>' for value in header)
+    yield f'<table class="candidate-table" role="table"><thead><tr>{head}</tr></thead><tbody>'
+
+    chunk = []
+    for i, row in enumerate(rows):
         row_class = "even" if i % 2 == 0 else "odd"
-        html += f'<tr class="{row_class}">'
-        for j, cell in enumerate(row):
-            cell_val = cell.value if cell.value is not None else ""
-            # Assume name column is 4th header (index 3). Adjust if needed.
-            if j == 3:
-                html += f'<td class="name-cell">{cell_val}</td>'
+        # Name is the 4th column (index 3)
+        cells = "".join(f'<td class="name-cell">{escape(cell_text(value))}</td>' if j == 3
+                        else f'<td>{escape(cell_text(value))}</td>' for j, value in enumerate(row))
+        chunk.append(f'<tr class="{row_class}">{cells}</tr>')
+        if len(chunk) >= chunk_rows:
+            yield "".join(chunk)
+            chunk = []
+    chunk.append('</tbody></table>')
+    yield "".join(chunk)
+
+def cell_text(value):
+    return "" if value is None else str(value)
+
+# --- In-memory index over the data rows, rebuilt only when the workbook changes ---
+class RecordIndex:
+    # Columns: Date, Day, Time, Candidate Name, Contact Number, Entry No
+    def __init__(self, data_rows):
+        self.rows = data_rows
+        self.times = []
+        self.names = []
+        self.contacts = []
+        self.by_entry = {}
+        self.by_contact = {}
+        keys = []
+        for i, row in enumerate(data_rows):
+            row = tuple(row) + (None,) * (6 - len(row))
+            date, time, name = cell_text(row[0]), cell_text(row[2]), cell_text(row[3])
+            contact, entry = cell_text(row[4]), cell_text(row[5])
+            self.times.append(time)
+            self.names.append(name.lower())
+            self.contacts.append(contact)
+            self.by_entry.setdefault(entry, []).append(i)
+            self.by_contact.setdefault(contact, []).append(i)
+            keys.append((date, time, i))
+        keys.sort()
+        self.sorted_keys = [(date, time) for date, time, _ in keys]
+        self.sorted_rows = [i for _, _, i in keys]
+
+    def search(self, q="", date_from="", date_to="", time_from="", time_to=""):
+        # Returns matching row positions in sheet order
+        if date_from or date_to:
+            lo = bisect_left(self.sorted_keys, (date_from, "")) if date_from else 0
+            hi = bisect_right(self.sorted_keys, (date_to, "\uffff")) if date_to else len(self.sorted_keys)
+            matches = sorted(self.sorted_rows[lo:hi])
+        else:
+            matches = range(len(self.rows))
+
+        q = q.strip()
+        if q:
+            if q.isdigit():
+                hits = set(self.by_entry.get(q, [])) | set(self.by_contact.get(q, []))
+                hits.update(i for i, contact in enumerate(self.contacts) if q in contact)
+            else:
+                needle = q.lower()
+                hits = {i for i, name in enumerate(self.names) if needle in name}
+            matches = sorted(hits) if isinstance(matches, range) else [i for i in matches if i in hits]
+
+        if time_from or time_to:
+            # <input type="time"> sends HH:MM; make the upper bound include that whole minute
+            if len(time_to) == 5:
+                time_to += ":59"
+            matches = [i for i in matches
+                       if (not time_from or self.times[i] >= time_from) and (not time_to or self.times[i] <= time_to)]
+        return list(matches)
+
+# --- Workbook cache: parsed and indexed once per version of the file ---
+class WorkbookSnapshot:
+    def __init__(self, stat_key, rows):
+        self.stat_key = stat_key
+        self.rows = rows
+        self.index = RecordIndex(rows[1:])
+        self.etag = f"{stat_key[0]}-{stat_key[1]}" if stat_key else "missing"
+        # Changes when the daily reset starts the sheet over, so stale cursors are detected
+        first = repr(rows[1]) if len(rows) > 1 else ""
+        self.generation = format(zlib.crc32(first.encode("utf-8")), "08x")
+        self.cursor = f"{self.generation}:{max(len(rows) - 1, 0)}"
+
+class WorkbookCache:
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.lock = threading.Lock()
+        self.snapshot = None
+
+    def get(self):
+        try:
+            st = os.stat(self.filepath)
+            stat_key = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stat_key = None
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.stat_key == stat_key:
+            return snapshot
+        with self.lock:
+            if self.snapshot is None or self.snapshot.stat_key != stat_key:
+                with metrics.timed("workbook_load"):
+                    rows = load_rows(self.filepath) if stat_key is not None else []
+                    self.snapshot = WorkbookSnapshot(stat_key, rows)
+            return self.snapshot
+
+workbook_cache = WorkbookCache(EXCEL_FILE)
+
+# --- Queue progress: today's calls read incrementally from queue_state.db, for the wait estimates ---
+class QueueProgress:
+    def __init__(self, db_path, state_file):
+        self.db_path = db_path
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.version = "none"
+        self.day = None
+        self.generation = None
+        self.last_id = 0
+        self.estimator = WaitEstimator()
+        self.called = {}  # today's token -> (room, time called)
+
+    def get(self):
+        # queue_state.json is rewritten on every call, so its stat tells us when to look at the database
+        try:
+            st = os.stat(self.state_file)
+            version = f"{st.st_mtime_ns}-{st.st_size}"
+        except FileNotFoundError:
+            version = "none"
+        with self.lock:
+            if version != self.version or self.day != today_str():
+                self.version = version
+                with metrics.timed("queue_progress"):
+                    self.refresh()
+            return self
+
+    def refresh(self):
+        today = today_str()
+        if not os.path.exists(self.db_path):
+            self.day, self.estimator, self.called = today, WaitEstimator(), {}
+            return
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=5)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+            generation = row[0] if row else 0
+            if today != self.day or generation != self.generation:
+                self.day, self.generation, self.last_id = today, generation, 0
+                self.estimator = WaitEstimator()
+                self.called = {}
+            rows = conn.execute(
+                "SELECT id, token, counter, timestamp FROM called_tokens WHERE day = ? AND id > ? ORDER BY id",
+                (today, self.last_id)
+            ).fetchall()
+        except sqlite3.Error:
+            return
+        finally:
+            conn.close()
+        for row_id, token, counter, timestamp in rows:
+            self.estimator.observe_call(counter, token, timestamp)
+            self.called[token] = (counter, str(timestamp)[11:19])
+            self.last_id = row_id
+
+    def wait_text(self, row):
+        # "Called", an ETA for today's waiting tokens, or blank for other days
+        if not row or cell_text(row[0]) != self.day or not isinstance(row[5] if len(row) > 5 else None, int):
+            return ""
+        return self.entry_wait(row[5])
+
+    def entry_wait(self, entry_no):
+        # For one of today's entry numbers
+        eta = self.estimator.eta_seconds(entry_no)
+        return "Called" if eta is None else format_eta(eta)
+
+queue_progress = QueueProgress(STATE_DB, STATE_FILE)
+history = HistoryStore()
+
+# --- Analytics: today's registrations and calls are added to the summaries as they happen ---
+queue_analytics = QueueAnalytics(state_db=STATE_DB)
+
+def follow_analytics():
+    version = None
+    while True:
+        try:
+            queue_analytics.update()
+        except (OSError, sqlite3.Error):
+            pass
+        version = listener.wait_for_change(version, ANALYTICS_POLL_SECONDS)
+
+page_cache = {}
+page_cache_lock = threading.Lock()
+
+def build_view(snapshot, args):
+    view = {
+        "q": args.get('q', '').strip(),
+        "date_from": args.get('date_from', '').strip(),
+        "date_to": args.get('date_to', '').strip(),
+        "time_from": args.get('time_from', '').strip(),
+        "time_to": args.get('time_to', '').strip(),
+    }
+    matches = snapshot.index.search(**view)
+    try:
+        per_page = int(args.get('per_page', DEFAULT_PER_PAGE))
+    except ValueError:
+        per_page = DEFAULT_PER_PAGE
+    if per_page not in PER_PAGE_CHOICES:
+        per_page = DEFAULT_PER_PAGE
+    pages = max(1, math.ceil(len(matches) / per_page))
+    # Without an explicit page, show the newest entries (they keep arriving on the last page)
+    try:
+        page = int(args.get('page', pages))
+    except ValueError:
+        page = pages
+    page = min(max(page, 1), pages)
+    filtered = any(view.values())
+    view.update({
+        "per_page": per_page,
+        "page": page,
+        "pages": pages,
+        "total": len(matches),
+        "filtered": filtered,
+        "live": not filtered and page == pages,
+        "rows": [snapshot.rows[1 + i] for i in matches[(page - 1) * per_page:page * per_page]],
+    })
+    return view
+
+def view_url(view, **changes):
+    params = {key: view[key] for key in ("q", "date_from", "date_to", "time_from", "time_to") if view[key]}
+    if view["per_page"] != DEFAULT_PER_PAGE:
+        params["per_page"] = view["per_page"]
+    params["page"] = view["page"]
+    params.update(changes)
+    return "/?" + urlencode(params)
+
+@app.route('/events')
+def events():
+    def stream():
+        version = listener.version
+        while True:
+            new_version = listener.wait_for_change(version, KEEPALIVE_SECONDS)
+            if new_version != version:
+                version = new_version
+                yield "data: workbook\n\n"
             else:
-                html += f'<td>{cell_val}</td>'
-        html += '</tr>'
-    html += '</tbody></table>'
-    return html
+                yield ": keep-alive\n\n"
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.route('/rows')
+def rows_since():
+    # Rows added after the client's cursor; reset=True means the sheet started over
+    snapshot = workbook_cache.get()
+    generation, _, count = request.args.get('since', '').partition(':')
+    try:
+        count = int(count)
+    except ValueError:
+        count = -1
+    data_rows = snapshot.rows[1:]
+    progress = queue_progress.get()
+    if generation != snapshot.generation or not 0 <= count <= len(data_rows):
+        response = jsonify(reset=True, cursor=snapshot.cursor, queue=progress.version, rows=[])
+    else:
+        rows = [[cell_text(v) for v in row] + [progress.wait_text(row)] for row in data_rows[count:]]
+        response = jsonify(reset=False, cursor=snapshot.cursor, queue=progress.version, rows=rows)
+    response.set_etag(f"{snapshot.etag}-{progress.version}-{count}", weak=True)
+    return response.make_conditional(request)
+
+@app.route('/waits')
+def waits():
+    # Est. Wait of the entry numbers on a page (?entries=12,13,...), for today's rows only
+    progress = queue_progress.get()
+    entries = sorted({int(e) for e in request.args.get('entries', '').split(',') if e.isdigit()})
+    response = jsonify(day=progress.day, queue=progress.version,
+                       waits={str(e): progress.entry_wait(e) for e in entries})
+    response.set_etag(f"{progress.version}-{zlib.crc32(request.query_string):08x}", weak=True)
+    return response.make_conditional(request)
 
 @app.route('/')
 def index():
-    table_html = excel_to_html(EXCEL_PATH)
-    now = datetime.now().strftime("%A, %d %B %Y  |  %I:%M:%S %p")
-    # Template: dark tech theme, Montserrat (Google Fonts), bold bright time, subtle name highlight
-    page = f'''<!doctype html>
+    snapshot = workbook_cache.get()
+    progress = queue_progress.get()
+    # A page only changes with the workbook (the clock ticks client-side and the Est. Wait cells
+    # are patched from /waits), so each view is rendered once per workbook version
+    page_etag = f"{snapshot.etag}-{int(listener.active)}"
+    cache_key = request.query_string
+    with page_cache_lock:
+        if page_cache.get('etag') != page_etag:
+            page_cache.clear()
+            page_cache['etag'] = page_etag
+        html = page_cache.get(cache_key)
+    metrics.count("page_requests", cached=html is not None)
+    if html is None:
+        with metrics.timed("page_render"):
+            html = render_index(snapshot, build_view(snapshot, request.args), progress)
+        with page_cache_lock:
+            if page_cache.get('etag') == page_etag and len(page_cache) <= PAGE_CACHE_SIZE:
+                page_cache[cache_key] = html
+    response = Response(html)
+    response.set_etag(f"{page_etag}-{zlib.crc32(cache_key):08x}", weak=True)
+    return response.make_conditional(request)
+
+@app.route('/all')
+def all_records():
+    # Every row ever exported, streamed straight from the workbook: the browser paints the first rows
+    # while the rest is still being read, and the server never holds the whole table
+    def stream():
+        yield f'''<!doctype html>
 <html lang="en">
 <head>
-<meta charset="utf-8" />
-<meta name="viewport" content="width=device-width,initial-scale=1" />
-<title>IITC Candidate Record Viewer</title>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<title>IITC Candidate Record Viewer - Full List</title>
+<link href="https://fonts.googleapis.com/css2?family=Montserrat:wght@400;600;700;800&display=swap" rel="stylesheet">
+{PAGE_STYLE}
+</head>
+<body>
+  <div class="container">
+    <header>
+      <h1>🎓 KTech Candidate Records</h1>
+      <div class="controls">
+        <a class="btn" href="/">&larr; Back</a>
+        <button class="btn" onclick="window.print()">Print</button>
+      </div>
+    </header>
+    <main>
+'''
+        with metrics.timed("stream_all"):
+            if not os.path.exists(EXCEL_FILE):
+                yield "<p style='color:#ffdede'>Excel file not found.</p>"
+            else:
+                yield from iter_table_html(iter_sheet_rows(EXCEL_FILE))
+        yield f'''
+    </main>
+    <div class="footer">
+      <div>All records from <strong style="color:var(--title)">{os.path.basename(EXCEL_FILE)}</strong></div>
+      <div>Full list • Dark tech theme</div>
+    </div>
+  </div>
+</body>
+</html>
+'''
+    return Response(stream_with_context(stream()), mimetype="text/html",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-<!-- Montserrat from Google Fonts (fallback to system fonts / Aptos if installed) -->
+@app.route('/history')
+def history_search():
+    # Registrations across days from the history store, e.g. every visit of a phone number in the last 90 days.
+    # ?format=json returns the same rows as JSON.
+    query = {key: request.args.get(key, '').strip() for key in ("contact", "entry_no", "name", "date_from", "date_to")}
+    entry_no = int(query["entry_no"]) if query["entry_no"].isdigit() else None
+    rows = []
+    elapsed = 0.0
+    error = None
+    if any(query.values()):
+        start = time.perf_counter()
+        try:
+            rows = history.registrations(contact=query["contact"] or None, entry_no=entry_no, name=query["name"] or None,
+                                         date_from=query["date_from"] or None, date_to=query["date_to"] or None)
+        except ValueError as e:
+            error, status = f"Dates must be YYYY-MM-DD ({e}).", 400
+        except sqlite3.Error as e:
+            # A month that can't be read would silently leave its rows out; say so instead
+            error, status = f"The history store could not be read: {e}", 503
+            metrics.count("history_query_failed")
+        elapsed = time.perf_counter() - start
+        metrics.observe("history_query", elapsed)
+        # Today's calls only reach the history store when the day is archived: take them from the live queue,
+        # and give today's waiting candidates their estimated wait
+        progress = queue_progress.get()
+        for row in rows:
+            row["est_wait"] = ""
+            if row["called_by"] or row["date"] != progress.day:
+                continue
+            call = progress.called.get(row["entry_no"])
+            if call is not None:
+                row["called_by"], row["called_at"] = call
+            elif isinstance(row["entry_no"], int):
+                row["est_wait"] = progress.entry_wait(row["entry_no"])
+
+    if request.args.get('format') == 'json':
+        if error:
+            return jsonify(error=error, rows=[], count=0), status
+        return jsonify(rows=rows, count=len(rows), ms=round(elapsed * 1000, 2))
+
+    if error:
+        table_html = f"<p style='color:#ffdede'>{escape(error)}</p>"
+        summary = ""
+    elif rows:
+        header = ("Date", "Day", "Time", "Candidate Name", "Contact Number", "Entry No", "Role", "Called By", "Called At", "Est. Wait")
+        keys = ("date", "day", "time", "name", "contact_number", "entry_no", "role", "called_by", "called_at", "est_wait")
+        table_html = rows_to_html([header] + [tuple(row[key] for key in keys) for row in rows])
+        summary = f"{len(rows)} registration(s) in {elapsed * 1000:.1f} ms"
+    elif any(query.values()):
+        table_html = "<p>No registrations found.</p>"
+        summary = f"Searched in {elapsed * 1000:.1f} ms"
+    else:
+        table_html = (f"<p>Search by contact number, entry number or name. Without a From date, the {DEFAULT_DAYS} days "
+                      "up to the To date (or today) are searched.</p>")
+        summary = ""
+    return f'''<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<title>IITC Candidate Record Viewer - History</title>
+<link href="https://fonts.googleapis.com/css2?family=Montserrat:wght@400;600;700;800&display=swap" rel="stylesheet">
+{PAGE_STYLE}
+</head>
+<body>
+  <div class="container">
+    <header>
+      <h1>🎓 KTech Candidate History</h1>
+      <div class="controls">
+        <a class="btn" href="/">&larr; Back</a>
+      </div>
+    </header>
+
+    <form class="filters" method="get" action="/history">
+      <label>Contact number <input type="search" name="contact" value="{escape(query["contact"])}" placeholder="e.g. 9840012345"></label>
+      <label>Entry no <input type="search" name="entry_no" value="{escape(query["entry_no"])}"></label>
+      <label>Name <input type="search" name="name" value="{escape(query["name"])}"></label>
+      <label>From date <input type="date" name="date_from" value="{escape(query["date_from"])}"></label>
+      <label>To date <input type="date" name="date_to" value="{escape(query["date_to"])}"></label>
+      <button class="btn" type="submit">Search</button>
+      <a class="btn" href="/history">Clear</a>
+    </form>
+
+    <main>
+      {table_html}
+    </main>
+
+    <div class="footer">
+      <div>{summary}</div>
+      <div>History store • Dark tech theme</div>
+    </div>
+  </div>
+</body>
+</html>
+'''
+
+def bar(value, peak, kind=""):
+    width = 100 * value / peak if peak else 0
+    return f'<div class="bar {kind}" style="width:{width:.1f}%"></div>'
+
+def rooms_html(rooms):
+    if not rooms:
+        return "<p>No calls.</p>"
+    return rows_to_html([("Room", "Calls", "Mean Time Between Calls", "P90 Time Between Calls")] +
+                        [(room["counter"], room["calls"], minutes_text(room["mean_gap_seconds"]),
+                          minutes_text(room["p90_gap_seconds"])) for room in rooms])
+
+@app.route('/analytics')
+def analytics_dashboard():
+    # Throughput summaries kept up to date by the analytics follower; ?format=json returns the same data
+    day = request.args.get('day', '').strip()
+    try:
+        day = datetime.strptime(day, "%Y-%m-%d").strftime("%Y-%m-%d") if day else None
+    except ValueError:
+        day = None
+    days = request.args.get('days', '')
+    days = min(int(days), 366) if days.isdigit() and int(days) > 0 else ANALYTICS_DAYS
+    start = time.perf_counter()
+    report = queue_analytics.report(day, days)
+    elapsed = time.perf_counter() - start
+    metrics.observe("analytics_report", elapsed)
+
+    if request.args.get('format') == 'json':
+        return jsonify(dict(report, ms=round(elapsed * 1000, 2)))
+
+    peak = max([max(h["registrations"], h["calls"]) for h in report["hours"]] + [0])
+    hour_rows = "".join(
+        f'<tr class="{"odd" if i % 2 == 0 else "even"}"><td>{h["hour"]:02d}:00</td>'
+        f'<td>{h["registrations"]}{bar(h["registrations"], peak)}</td>'
+        f'<td>{h["calls"]}{bar(h["calls"], peak, "calls")}</td><td>{h["backlog"]}</td></tr>'
+        for i, h in enumerate(report["hours"])
+    )
+    hours_html = (f'<table class="candidate-table"><thead><tr><th>Hour</th><th>Registered</th><th>Called</th>'
+                  f'<th>Waiting at End of Hour</th></tr></thead><tbody>{hour_rows}</tbody></table>'
+                  if hour_rows else "<p>No registrations or calls.</p>")
+    day_peak = max([d["registrations"] for d in report["days"]] + [0])
+    day_rows = "".join(
+        f'<tr class="{"odd" if i % 2 == 0 else "even"}"><td><a class="btn" href="/analytics?day={d["date"]}&amp;days={days}">{d["date"]}</a></td>'
+        f'<td>{d["registrations"]}{bar(d["registrations"], day_peak)}</td>'
+        f'<td>{d["calls"]}{bar(d["calls"], day_peak, "calls")}</td><td>{d["peak_backlog"]}</td></tr>'
+        for i, d in enumerate(reversed(report["days"]))
+    )
+    days_html = (f'<table class="candidate-table"><thead><tr><th>Date</th><th>Registered</th><th>Called</th>'
+                 f'<th>Peak Waiting</th></tr></thead><tbody>{day_rows}</tbody></table>'
+                 if day_rows else "<p>No days summarised yet. Run <code>python analytics.py rebuild</code> once for earlier days.</p>")
+
+    return f'''<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<title>IITC Candidate Record Viewer - Analytics</title>
 <link href="https://fonts.googleapis.com/css2?family=Montserrat:wght@400;600;700;800&display=swap" rel="stylesheet">
+{PAGE_STYLE}
+</head>
+<body>
+  <div class="container">
+    <header>
+      <h1>📊 KTech Queue Analytics</h1>
+      <div class="controls">
+        <div class="time">Waiting: {report["backlog"]}</div>
+        <a class="btn" href="/history">History</a>
+        <a class="btn" href="/">&larr; Back</a>
+      </div>
+    </header>
+
+    <form class="filters" method="get" action="/analytics">
+      <label>Day <input type="date" name="day" value="{escape(report["day"])}"></label>
+      <label>Days in summary <input type="number" name="days" min="1" max="366" value="{days}"></label>
+      <button class="btn" type="submit">Show</button>
+      <a class="btn" href="/analytics">Today</a>
+    </form>
+
+    <main>
+      <h2 class="section-title">{escape(report["day"])} by hour</h2>
+      {hours_html}
+      <h2 class="section-title">Rooms on {escape(report["day"])}</h2>
+      {rooms_html(report["rooms"])}
+      <h2 class="section-title">Per day, {escape(report["from"])} to {escape(report["day"])}</h2>
+      {days_html}
+      <h2 class="section-title">Rooms, {escape(report["from"])} to {escape(report["day"])}</h2>
+      {rooms_html(report["period_rooms"])}
+    </main>
+
+    <div class="footer">
+      <div>Built in {elapsed * 1000:.1f} ms from the daily summaries</div>
+      <div>Time between calls excludes breaks over {minutes_text(GAP_BUCKETS[-1])}</div>
+    </div>
+  </div>
+<script>
+  if (window.EventSource && {'true' if listener.active else 'false'}) {{
+    new EventSource('/events').onmessage = () => location.reload();
+  }}
+</script>
+</body>
+</html>
+'''
 
-<style>
-  :root{{
+@app.route('/metrics')
+def prometheus_metrics():
+    # Every app's latency histograms and counters, collected from the metrics/ folder
+    text = metrics.render_prometheus(metrics.collect(own=metrics.recorder()))
+    return Response(text, mimetype="text/plain; version=0.0.4")
+
+# Shared by the paged view and the streamed full list
+PAGE_STYLE = """<style>
+  :root{
     --bg: #0f1214;            /* page background */
     --panel: #15171a;         /* table panel */
     --muted: #bfc8cc;         /* muted text */
@@ -70,9 +629,9 @@ def index():
     --row-even: #1a1c1e;
     --name-highlight: rgba(0,191,165,0.08); /* subtle name background */
     --border: rgba(255,255,255,0.04);
-  }}
+  }
 
-  html,body {{
+  html,body {
     height:100%;
     margin:0;
     background:var(--bg);
@@ -80,9 +639,9 @@ def index():
     font-family: "Montserrat", Aptos, "Segoe UI", Roboto, Helvetica, Arial, sans-serif;
     -webkit-font-smoothing:antialiased;
     -moz-osx-font-smoothing:grayscale;
-  }}
+  }
 
-  .container {{
+  .container {
     max-width:1200px;
     margin:32px auto;
     padding:28px;
@@ -90,38 +649,38 @@ def index():
     border-radius:12px;
     box-shadow: 0 8px 30px rgba(0,0,0,0.6);
     border: 1px solid var(--border);
-  }}
+  }
 
-  header {{
+  header {
     display:flex;
     align-items:center;
     justify-content:space-between;
     gap:16px;
     margin-bottom:18px;
-  }}
+  }
 
-  h1 {{
+  h1 {
     margin:0;
     color:var(--title);
     font-weight:800;
     font-size:28px;
     letter-spacing:0.2px;
-  }}
+  }
 
-  .time {{
+  .time {
     color:var(--subtitle);
     font-weight:800; /* bold and bright per request */
     font-size:16px;
     background:transparent;
-  }}
+  }
 
-  .controls {{
+  .controls {
     display:flex;
     gap:12px;
     align-items:center;
-  }}
+  }
 
-  .btn {{
+  .btn {
     background:transparent;
     border:1px solid rgba(255,255,255,0.06);
     color:var(--muted);
@@ -130,24 +689,24 @@ def index():
     cursor:pointer;
     font-weight:600;
     transition: all 160ms ease;
-  }}
-  .btn:hover{{
+  }
+  .btn:hover{
     transform:translateY(-2px);
     box-shadow: 0 6px 20px rgba(10,132,166,0.12);
     color:var(--title);
     border-color:rgba(0,229,255,0.12);
-  }}
+  }
 
   /* Table */
-  .candidate-table {{
+  .candidate-table {
     width:100%;
     border-collapse:collapse;
     overflow:hidden;
     border-radius:8px;
     table-layout:fixed;
-  }}
+  }
 
-  .candidate-table thead th {{
+  .candidate-table thead th {
     text-align:left;
     padding:14px 16px;
     font-weight:700;
@@ -157,53 +716,211 @@ def index():
     top:0;
     background:linear-gradient(180deg, rgba(255,255,255,0.01), rgba(255,255,255,0.00));
     border-bottom:1px solid var(--border);
-  }}
+  }
 
-  .candidate-table tbody td {{
+  .candidate-table tbody td {
     padding:12px 16px;
     font-size:14px;
     color:var(--muted);
     white-space:nowrap;
     overflow:hidden;
     text-overflow:ellipsis;
-  }}
+  }
 
-  .candidate-table tbody tr.odd {{
+  .candidate-table tbody tr.odd {
     background:var(--row-odd);
-  }}
-  .candidate-table tbody tr.even {{
+  }
+  .candidate-table tbody tr.even {
     background:var(--row-even);
-  }}
+  }
 
   /* subtle name highlight cell, not too contrasty */
-  .candidate-table .name-cell {{
+  .candidate-table .name-cell {
     background:var(--name-highlight);
     color:var(--muted);
     border-radius:4px;
     padding:10px 14px;
-  }}
+  }
 
   /* responsive */
-  @media (max-width:900px) {{
+  @media (max-width:900px) {
     .candidate-table thead th:nth-child(2),
-    .candidate-table tbody td:nth-child(2) {{ display:none; }} /* hide Name on small screens */
-  }}
+    .candidate-table tbody td:nth-child(2) { display:none; } /* hide Name on small screens */
+  }
 
-  .footer {{
+  .filters {
+    display:flex;
+    flex-wrap:wrap;
+    gap:10px;
+    align-items:flex-end;
+    margin-bottom:16px;
+  }
+  .filters label {
+    display:flex;
+    flex-direction:column;
+    gap:4px;
+    font-size:12px;
+    color:rgba(255,255,255,0.45);
+  }
+  .filters input, .filters select {
+    background:var(--panel);
+    border:1px solid rgba(255,255,255,0.08);
+    color:var(--muted);
+    padding:7px 10px;
+    border-radius:8px;
+    font-family:inherit;
+    color-scheme:dark;
+  }
+  .filters input[name="q"] {
+    min-width:240px;
+  }
+  a.btn {
+    text-decoration:none;
+  }
+
+  .pager {
+    margin-top:16px;
+    display:flex;
+    align-items:center;
+    justify-content:center;
+    gap:12px;
+    font-size:14px;
+  }
+
+  .section-title {
+    margin:24px 0 10px;
+    color:var(--title);
+    font-size:18px;
+  }
+  .bar {
+    height:8px;
+    border-radius:4px;
+    margin:2px 0;
+    background:var(--subtitle);
+  }
+  .bar.calls {
+    background:var(--accent);
+  }
+
+  .footer {
     margin-top:16px;
     display:flex;
     justify-content:space-between;
     gap:8px;
     color:rgba(255,255,255,0.25);
     font-size:13px;
-  }}
-</style>
+  }
+</style>"""
 
-<!-- Auto-refresh the page every 3 seconds (same as before) -->
+def render_index(snapshot, view, progress):
+    if snapshot.stat_key is None:
+        table_html = excel_to_html(EXCEL_FILE)
+    elif not snapshot.rows:
+        table_html = rows_to_html([])
+    else:
+        # Estimated wait for today's candidates who haven't been called yet
+        table_html = rows_to_html([tuple(snapshot.rows[0]) + ("Est. Wait",)] +
+                                  [tuple(row) + (progress.wait_text(row),) for row in view["rows"]])
+    first = (view["page"] - 1) * view["per_page"] + 1 if view["total"] else 0
+    last = min(view["page"] * view["per_page"], view["total"])
+    prev_link = f'<a class="btn" href="{escape(view_url(view, page=view["page"] - 1))}">&larr; Prev</a>' if view["page"] > 1 else ''
+    next_link = f'<a class="btn" href="{escape(view_url(view, page=view["page"] + 1))}">Next &rarr;</a>' if view["page"] < view["pages"] else ''
+    per_page_options = "".join(
+        f'<option value="{n}"{" selected" if n == view["per_page"] else ""}>{n} / page</option>' for n in PER_PAGE_CHOICES
+    )
+    now = datetime.now().strftime("%A, %d %B %Y  |  %I:%M:%S %p")
+    # Template: dark tech theme, Montserrat (Google Fonts), bold bright time, subtle name highlight
+    page = f'''<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8" />
+<meta name="viewport" content="width=device-width,initial-scale=1" />
+<title>IITC Candidate Record Viewer</title>
+
+<!-- Montserrat from Google Fonts (fallback to system fonts / Aptos if installed) -->
+<link href="https://fonts.googleapis.com/css2?family=Montserrat:wght@400;600;700;800&display=swap" rel="stylesheet">
+
+{PAGE_STYLE}
+
+<!-- Append new rows when the server pushes a change; plain 3 second polling only if push is unavailable -->
 <script>
-  setTimeout(() => {{
-    window.location.reload();
-  }}, 3000);
+  let cursor = "{snapshot.cursor}";
+  let queueVersion = "{progress.version}";
+  // Only the unfiltered last page follows new registrations
+  const live = {'true' if view["live"] else 'false'};
+
+  function appendRows() {{
+    fetch('/rows?since=' + encodeURIComponent(cursor), {{ cache: 'no-cache' }})
+      .then(r => r.ok ? r.json() : null)
+      .then(data => {{
+        if (!data) return;
+        const tbody = document.querySelector('.candidate-table tbody');
+        if (data.reset || !tbody) {{
+          window.location.reload();
+          return;
+        }}
+        for (const row of data.rows) {{
+          const tr = document.createElement('tr');
+          tr.className = tbody.rows.length % 2 === 0 ? 'even' : 'odd';
+          row.forEach((value, j) => {{
+            const td = document.createElement('td');
+            if (j === 3) td.className = 'name-cell';
+            td.textContent = value;
+            tr.appendChild(td);
+          }});
+          tbody.appendChild(tr);
+        }}
+        cursor = data.cursor;
+        if (data.queue !== queueVersion) refreshWaits();
+      }})
+      .catch(() => {{}});
+  }}
+
+  // A room called a token: only the Est. Wait cells of today's rows change, patched in place
+  function refreshWaits() {{
+    const tbody = document.querySelector('.candidate-table tbody');
+    if (!tbody || !tbody.rows.length) return;
+    const entries = new Set();
+    for (const tr of tbody.rows) {{
+      if (tr.cells.length > 6) entries.add(tr.cells[5].textContent);
+    }}
+    fetch('/waits?entries=' + [...entries].join(','), {{ cache: 'no-cache' }})
+      .then(r => r.ok ? r.json() : null)
+      .then(data => {{
+        if (!data) return;
+        queueVersion = data.queue;
+        for (const tr of tbody.rows) {{
+          const wait = tr.cells.length > 6 && tr.cells[0].textContent === data.day ? data.waits[tr.cells[5].textContent] : undefined;
+          if (wait !== undefined) tr.cells[tr.cells.length - 1].textContent = wait;
+        }}
+      }})
+      .catch(() => {{}});
+  }}
+
+  function onChange() {{
+    if (live) appendRows();
+    else refreshWaits();
+  }}
+
+  function tickClock() {{
+    const now = new Date();
+    const date = now.toLocaleDateString('en-GB', {{ weekday: 'long', day: '2-digit', month: 'long', year: 'numeric' }}).replace(',', '');
+    const time = now.toLocaleTimeString('en-US', {{ hour: '2-digit', minute: '2-digit', second: '2-digit', hour12: true }});
+    document.querySelector('.time').textContent = date + '  |  ' + time;
+  }}
+
+  document.addEventListener('DOMContentLoaded', () => {{
+    setInterval(tickClock, 1000);
+    // The page may come from the cache with older waits
+    refreshWaits();
+    if (window.EventSource && {'true' if listener.active else 'false'}) {{
+      const events = new EventSource('/events');
+      events.onmessage = onChange;
+      setInterval(onChange, 30000);
+    }} else {{
+      setInterval(onChange, 3000);
+    }}
+  }});
 </script>
 </head>
 <body>
@@ -216,24 +933,58 @@ def index():
         <div class="controls">
           <button class="btn" onclick="location.reload()">Refresh</button>
           <button class="btn" onclick="window.print()">Print</button>
+          <a class="btn" href="/all">Full List</a>
+          <a class="btn" href="/history">History</a>
+          <a class="btn" href="/analytics">Analytics</a>
         </div>
       </div>
     </header>
 
+    <form class="filters" method="get" action="/">
+      <label>Search name, contact or entry no
+        <input type="search" name="q" value="{escape(view["q"])}" placeholder="e.g. Priya, 98400, 42">
+      </label>
+      <label>From date <input type="date" name="date_from" value="{escape(view["date_from"])}"></label>
+      <label>To date <input type="date" name="date_to" value="{escape(view["date_to"])}"></label>
+      <label>From time <input type="time" name="time_from" value="{escape(view["time_from"])}"></label>
+      <label>To time <input type="time" name="time_to" value="{escape(view["time_to"])}"></label>
+      <label>Rows <select name="per_page">{per_page_options}</select></label>
+      <button class="btn" type="submit">Apply</button>
+      <a class="btn" href="/">Clear</a>
+    </form>
+
     <main>
       {table_html}
     </main>
 
+    <div class="pager">
+      {prev_link}
+      <span>Page {view["page"]} of {view["pages"]} • Rows {first}–{last} of {view["total"]}</span>
+      {next_link}
+    </div>
+
     <div class="footer">
-      <div>Showing records from <strong style="color:var(--title)">{os.path.basename(EXCEL_PATH)}</strong></div>
-      <div>Auto-refresh every 3s • Dark tech theme</div>
+      <div>Showing records from <strong style="color:var(--title)">{os.path.basename(EXCEL_FILE)}</strong></div>
+      <div>Live updates • Dark tech theme</div>
     </div>
   </div>
 </body>
 </html>
 '''
-    return render_template_string(page)
+    # Returned as-is: search terms end up in the page, so it must not go through a template engine
+    return page
+
+def start_background():
+    listener.start()
+    # Writes History/analytics.db under the current folder, so only the running viewer follows
+    threading.Thread(target=follow_analytics, name="AnalyticsFollower", daemon=True).start()
+
 
 if __name__ == '__main__':
+    metrics.configure("viewer")
+    debug = True
+    # With debug on this file runs twice: a reloader that watches the source, and the server it starts
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background()
     # Use port 5000 or 80 as you prefer. 80 may need elevated privileges.
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=5000, debug=debug)
@@ -0,0 +1,356 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from app_files import JOURNAL_FILE, STATE_DB, HISTORY_FOLDER, today_str
+from registration_journal import JournalReader
+from history_store import HistoryStore, QUERY_LIMIT
+from wait_estimator import MAX_INTERVAL
+from sqlite_mode import set_journal_mode
+
+# Throughput summaries (registrations and calls per hour, time between calls per room) kept up to date
+# as the journal and queue_state.db grow, so a dashboard never has to rescan either file or the history.
+ANALYTICS_DB = os.path.join(HISTORY_FOLDER, "analytics.db")
+DEFAULT_DAYS = 30  # days in the per-day summary
+GAP_BUCKETS = list(range(60, MAX_INTERVAL + 1, 60))  # time between calls in 1-minute steps; longer gaps are breaks
+
+
+def hour_of(value):
+    # "14:05:09" or "2025-01-31T14:05:09.123" -> 14
+    try:
+        text = str(value)
+        return int(text[11:13] if "T" in text else text[:2])
+    except ValueError:
+        return None
+
+
+def parse_timestamp(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def gap_percentile(buckets, count, fraction):
+    # Upper bound of the bucket holding the given fraction of the gaps, in seconds
+    if not count:
+        return None
+    target = count * fraction
+    seen = 0
+    for bound, value in zip(GAP_BUCKETS, buckets):
+        seen += value
+        if seen >= target:
+            return bound
+    return GAP_BUCKETS[-1]
+
+
+# --- One day's aggregates: 24 hours and one row per room, however many candidates there were ---
+class DayStats:
+    def __init__(self, day):
+        self.day = day
+        self.registrations = [0] * 24
+        self.calls = [0] * 24
+        self.rooms = {}  # counter -> [calls, gap count, gap sum, bucket counts...]
+        self.last_call = {}  # counter -> time of its latest call
+
+    def add_registration(self, time_text):
+        hour = hour_of(time_text)
+        if hour is not None and 0 <= hour < 24:
+            self.registrations[hour] += 1
+
+    def add_call(self, counter, timestamp):
+        when = parse_timestamp(timestamp)
+        if when is None:
+            return
+        self.calls[when.hour] += 1
+        room = self.rooms.get(counter)
+        if room is None:
+            room = self.rooms[counter] = [0, 0, 0.0] + [0] * len(GAP_BUCKETS)
+        room[0] += 1
+        last = self.last_call.get(counter)
+        self.last_call[counter] = when
+        if last is not None:
+            gap = (when - last).total_seconds()
+            if 0 < gap <= MAX_INTERVAL:
+                room[1] += 1
+                room[2] += gap
+                room[3 + bisect_left(GAP_BUCKETS, gap)] += 1
+
+    def clear_registrations(self):
+        self.registrations = [0] * 24
+
+
+# --- Summaries of every day in History/analytics.db, today's advanced incrementally ---
+class QueueAnalytics:
+    def __init__(self, journal_file=JOURNAL_FILE, state_db=STATE_DB, db_path=ANALYTICS_DB, history_folder=HISTORY_FOLDER):
+        self.reader = JournalReader(journal_file)
+        self.state_db = state_db
+        self.db_path = db_path
+        self.history_folder = history_folder
+        self.lock = threading.Lock()
+        self.conn = None
+        self.today = None
+        self.last_id = 0  # called_tokens ids are never reused, so this survives queue resets
+        self.archived = set()  # (token, timestamp) of today's calls already counted from the history store
+
+    def _connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+            set_journal_mode(conn, self.db_path)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS hours (
+                    day TEXT NOT NULL,
+                    hour INTEGER NOT NULL,
+                    registrations INTEGER NOT NULL,
+                    calls INTEGER NOT NULL,
+                    PRIMARY KEY (day, hour)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rooms (
+                    day TEXT NOT NULL,
+                    counter TEXT NOT NULL,
+                    calls INTEGER NOT NULL,
+                    gap_count INTEGER NOT NULL,
+                    gap_sum REAL NOT NULL,
+                    gap_buckets TEXT NOT NULL,
+                    PRIMARY KEY (day, counter)
+                )
+            """)
+            self.conn = conn
+        return self.conn
+
+    def save(self, stats):
+        # A day is rewritten as a whole: at most 24 hour rows and one row per room
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM hours WHERE day = ?", (stats.day,))
+            conn.execute("DELETE FROM rooms WHERE day = ?", (stats.day,))
+            conn.executemany("INSERT INTO hours (day, hour, registrations, calls) VALUES (?, ?, ?, ?)",
+                             [(stats.day, hour, stats.registrations[hour], stats.calls[hour]) for hour in range(24)
+                              if stats.registrations[hour] or stats.calls[hour]])
+            conn.executemany("INSERT INTO rooms (day, counter, calls, gap_count, gap_sum, gap_buckets) VALUES (?, ?, ?, ?, ?, ?)",
+                             [(stats.day, counter, room[0], room[1], room[2], json.dumps(room[3:]))
+                              for counter, room in stats.rooms.items()])
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def update(self):
+        # Adds the registrations and calls made since the last update; returns True if anything changed
+        day = today_str()
+        with self.lock:
+            if self.today is not None and self.today.day != day:
+                # Midnight: what came in since the last update still belongs to the day that ended
+                if self._poll_journal(final=True) | self._poll_calls():
+                    self.save(self.today)
+                self.today = None
+            if self.today is None:
+                # Starting up or a new day: today is counted from its sources once, then followed
+                self.start_day(day)
+            changed = self._poll_journal()
+            changed = self._poll_calls() or changed
+            if changed:
+                self.save(self.today)
+            return changed
+
+    def start_day(self, day):
+        # Calls moved out of queue_state.db by the end-of-day archive are only in the history store,
+        # so a restart after it counts them from there instead of losing them
+        stats = DayStats(day)
+        archived = HistoryStore(self.history_folder).calls(day=day, limit=QUERY_LIMIT * 100)
+        for call in reversed(archived):
+            stats.add_call(call["counter"], call["timestamp"])
+        self.archived = {(call["token"], call["timestamp"]) for call in archived}
+        self.today = stats
+        self.reader.rewind()
+        self.last_id = 0
+
+    def _poll_journal(self, final=False):
+        reloaded, records = self.reader.poll()
+        if reloaded and not final:
+            # The journal was emptied (Reset Counter): today's registrations are counted again
+            self.today.clear_registrations()
+        for record in records:
+            if record.get("date") == self.today.day:
+                self.today.add_registration(record.get("time"))
+        return reloaded or bool(records)
+
+    def _poll_calls(self):
+        if not os.path.exists(self.state_db):
+            return False
+        conn = sqlite3.connect(f"file:{self.state_db}?mode=ro", uri=True, timeout=5)
+        try:
+            rows = conn.execute(
+                "SELECT id, token, counter, timestamp FROM called_tokens WHERE day = ? AND id > ? ORDER BY id",
+                (self.today.day, self.last_id)
+            ).fetchall()
+        except sqlite3.Error:
+            return False
+        finally:
+            conn.close()
+        for row_id, token, counter, timestamp in rows:
+            # Archived and not yet deleted when the archive was interrupted: already counted
+            if (token, timestamp) not in self.archived:
+                self.today.add_call(counter, timestamp)
+            self.last_id = row_id
+        return bool(rows)
+
+    def stored_totals(self, day):
+        row = self._connect().execute("SELECT SUM(registrations), SUM(calls) FROM hours WHERE day = ?", (day,)).fetchone()
+        return row[0] or 0, row[1] or 0
+
+    def rebuild(self, history, date_from=None, date_to=None):
+        # Earlier days from the history store (after upgrading, or days the viewer wasn't running);
+        # today stays with the live follower. Returns the number of days written.
+        today = today_str()
+        date_from, date_to = date_from or "0000-00-00", date_to or "9999-99-99"
+        written = 0
+        for month in sorted(history.months(date_from, date_to)):
+            days = {}
+            conn = sqlite3.connect(f"file:{history.partition_path(month)}?mode=ro", uri=True, timeout=5)
+            try:
+                for day, time_text in conn.execute(
+                        "SELECT date, time FROM registrations WHERE date BETWEEN ? AND ?", (date_from, date_to)):
+                    days.setdefault(day, DayStats(day)).add_registration(time_text)
+                for day, counter, timestamp in conn.execute(
+                        "SELECT day, counter, timestamp FROM calls WHERE day BETWEEN ? AND ? ORDER BY day, timestamp",
+                        (date_from, date_to)):
+                    days.setdefault(day, DayStats(day)).add_call(counter, timestamp)
+            except sqlite3.Error:
+                continue
+            finally:
+                conn.close()
+            for day, stats in days.items():
+                if day == today:
+                    continue
+                with self.lock:
+                    # Never replaces a day with smaller totals (e.g. history rows that failed to be written)
+                    registrations, calls = self.stored_totals(day)
+                    if sum(stats.registrations) < registrations or sum(stats.calls) < calls:
+                        continue
+                    self.save(stats)
+                    written += 1
+        return written
+
+    def report(self, day=None, days=DEFAULT_DAYS):
+        # One day's hours and rooms plus a per-day summary of the `days` days up to it. Only the summary
+        # rows of that window are read, so the cost doesn't grow with the length of the history.
+        try:
+            self.update()
+        except (OSError, sqlite3.Error):
+            # The summaries saved so far are still shown
+            pass
+        day = day or today_str()
+        date_from = (datetime.strptime(day, "%Y-%m-%d") - timedelta(days=max(days, 1) - 1)).strftime("%Y-%m-%d")
+        with self.lock:
+            conn = self._connect()
+            hour_rows = conn.execute("SELECT day, hour, registrations, calls FROM hours WHERE day BETWEEN ? AND ? "
+                                     "ORDER BY day, hour", (date_from, day)).fetchall()
+            room_rows = conn.execute("SELECT day, counter, calls, gap_count, gap_sum, gap_buckets FROM rooms "
+                                     "WHERE day BETWEEN ? AND ?", (date_from, day)).fetchall()
+
+        per_day = {}
+        for row_day, hour, registrations, calls in hour_rows:
+            per_day.setdefault(row_day, []).append((hour, registrations, calls))
+        summary = []
+        hours = []
+        for row_day, rows in sorted(per_day.items()):
+            # Backlog: registered but not yet called, at the end of each hour
+            backlog = peak = 0
+            for hour, registrations, calls in rows:
+                backlog = max(backlog + registrations - calls, 0)
+                peak = max(peak, backlog)
+                if row_day == day:
+                    hours.append({"hour": hour, "registrations": registrations, "calls": calls, "backlog": backlog})
+            summary.append({"date": row_day, "registrations": sum(r[1] for r in rows),
+                            "calls": sum(r[2] for r in rows), "peak_backlog": peak})
+
+        return {
+            "day": day,
+            "from": date_from,
+            "hours": hours,
+            "backlog": hours[-1]["backlog"] if hours else 0,
+            "rooms": room_summary(row for row in room_rows if row[0] == day),
+            "days": summary,
+            "period_rooms": room_summary(room_rows),
+        }
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+def room_summary(rows):
+    # Adds up (day, counter, calls, gap count, gap sum, buckets) rows per room
+    rooms = {}
+    for _, counter, calls, gap_count, gap_sum, gap_buckets in rows:
+        room = rooms.get(counter)
+        if room is None:
+            room = rooms[counter] = [0, 0, 0.0, [0] * len(GAP_BUCKETS)]
+        room[0] += calls
+        room[1] += gap_count
+        room[2] += gap_sum
+        for i, value in enumerate(json.loads(gap_buckets)[:len(GAP_BUCKETS)]):
+            room[3][i] += value
+    return [{"counter": counter, "calls": calls,
+             "mean_gap_seconds": round(gap_sum / gap_count) if gap_count else None,
+             "p90_gap_seconds": gap_percentile(buckets, gap_count, 0.9)}
+            for counter, (calls, gap_count, gap_sum, buckets) in sorted(rooms.items())]
+
+
+def minutes_text(seconds):
+    return "-" if seconds is None else f"{seconds / 60:.1f} min"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Registration and call throughput summaries.")
+    parser.add_argument("--db", default=ANALYTICS_DB)
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild", help="summarise earlier days from the history store")
+    rebuild.add_argument("--from", dest="date_from")
+    rebuild.add_argument("--to", dest="date_to")
+    rebuild.add_argument("--history", default=HISTORY_FOLDER)
+    report = commands.add_parser("report", help="print one day's hours and rooms and a per-day summary")
+    report.add_argument("--day", help="YYYY-MM-DD (default: today)")
+    report.add_argument("--days", type=int, default=DEFAULT_DAYS)
+    report.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    analytics = QueueAnalytics(db_path=args.db)
+    if args.command == "rebuild":
+        written = analytics.rebuild(HistoryStore(args.history), args.date_from, args.date_to)
+        analytics.close()
+        print(f"Summarised {written} day(s) into {args.db}")
+        return 0
+
+    result = analytics.report(args.day, args.days)
+    analytics.close()
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return 0
+    print(f"{result['day']}  (waiting now: {result['backlog']})")
+    print(f"  {'hour':<6} {'registered':>10} {'called':>7} {'backlog':>8}")
+    for row in result["hours"]:
+        print(f"  {row['hour']:02d}:00  {row['registrations']:>10} {row['calls']:>7} {row['backlog']:>8}")
+    print(f"  {'room':<12} {'calls':>6} {'mean gap':>10} {'p90 gap':>10}")
+    for room in result["rooms"]:
+        print(f"  {room['counter']:<12} {room['calls']:>6} {minutes_text(room['mean_gap_seconds']):>10} "
+              f"{minutes_text(room['p90_gap_seconds']):>10}")
+    print(f"Last {args.days} days:")
+    for row in result["days"]:
+        print(f"  {row['date']}  {row['registrations']:>6} registered {row['calls']:>6} called  peak backlog {row['peak_backlog']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
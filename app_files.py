@@ -0,0 +1,20 @@
+import os
+from datetime import datetime
+
+# --- The shared files every app works on, relative to the app folder ---
+# Defined once here; the engine modules and the apps import them from this module (or from queue_engine).
+CONFIG_FOLDER = "config"
+JOURNAL_FILE = "candidate_journal.jsonl"
+EXCEL_FILE = "candidate_list.xlsx"
+TICKET_FOLDER = "Tickets"
+STATE_DB = "queue_state.db"
+STATE_FILE = "queue_state.json"
+ARCHIVE_FOLDER = "Archive"
+HISTORY_FOLDER = "History"
+COUNTER_DB = os.path.join(CONFIG_FOLDER, "ticket_counter.db")
+DATE_TRACK_FILE = os.path.join(CONFIG_FOLDER, "last_ticket_date.txt")
+
+
+def today_str():
+    # The day key of the journal, the entry numbers and the queue database
+    return datetime.now().strftime("%Y-%m-%d")
@@ -0,0 +1,266 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import change_notify
+
+SIZES = [100, 1000, 10000, 50000]
+BASELINE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+DEFAULT_BASELINE = os.path.join(BASELINE_FOLDER, "baseline.json")
+MIN_REPEATS = 3
+MAX_REPEATS = 50
+TARGET_SECONDS = 0.5  # keep repeating a benchmark until it has run this long (or MAX_REPEATS)
+REGRESSION_THRESHOLD = 0.25  # median more than 25% slower than the baseline is flagged
+NOISE_FLOOR = 0.0002  # seconds; differences below this are timer noise, never a regression
+ROOMS = 20
+
+
+def load_app(filename, module_name):
+    # The app scripts have spaces in their names, so they are loaded by path
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_records(count, date):
+    return [{"date": date, "day": "Monday", "time": f"{9 + i * 8 // max(count, 1):02d}:{i % 60:02d}:00",
+             "name": f"Candidate {i}", "contact_number": f"9{i:09d}", "entry_no": i}
+            for i in range(1, count + 1)]
+
+
+# --- Fixtures: a scratch folder holding a day's journal, workbook and queue database of `size` rows ---
+class Fixture:
+    def __init__(self, size):
+        from app_files import JOURNAL_FILE, EXCEL_FILE
+        from registration_journal import RegistrationJournal, write_excel
+        from queue_store import QueueStore
+
+        self.size = size
+        self.today = datetime.now().strftime("%Y-%m-%d")
+        self.records = make_records(size, self.today)
+        self.journal = RegistrationJournal(JOURNAL_FILE)
+        self.journal.append_many(self.records)
+        write_excel(self.records, EXCEL_FILE)
+
+        # Half of the day already called, spread over the rooms, written in one transaction
+        store = QueueStore()
+        with store.transaction():
+            for i, record in enumerate(self.records[:size // 2]):
+                timestamp = f"{self.today}T{record['time']}.{i % 1000:03d}"
+                store._insert_call(self.today, record["entry_no"], record["name"], f"Room {i % ROOMS + 1}",
+                                   record["time"], timestamp)
+        store.write_state_file()
+        store.close()
+
+
+def timed(fn, prepare=None):
+    timings = []
+    total = 0.0
+    while len(timings) < MIN_REPEATS or (total < TARGET_SECONDS and len(timings) < MAX_REPEATS):
+        state = prepare() if prepare else None
+        start = time.perf_counter()
+        fn(state) if prepare else fn()
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        total += elapsed
+    return {"median_s": statistics.median(timings), "min_s": min(timings), "repeats": len(timings)}
+
+
+# --- The hot paths ---
+def bench_get_last_ticket_number(fixture):
+    # POS startup on a day the counter hasn't seen yet: seeds from the journal, then reads the counter
+    from ticket_counter import TicketCounter
+
+    def prepare():
+        if os.path.exists("bench_counter.db"):
+            os.remove("bench_counter.db")
+        return TicketCounter("bench_counter.db")
+
+    def run(counter):
+        counter.seed(lambda: sum(1 for r in fixture.journal.read_all() if r.get("date") == fixture.today))
+        counter.current()
+        counter.close()
+    return timed(run, prepare)
+
+
+def bench_generate_ticket_persist(fixture):
+    # generate_ticket without the dialogs and the PDF: next number + journal append
+    from ticket_counter import TicketCounter
+    counter = TicketCounter("bench_counter_persist.db")
+    record = dict(fixture.records[-1])
+
+    def run():
+        record["entry_no"] = counter.next_number()
+        fixture.journal.append(record)
+    result = timed(run)
+    counter.close()
+    return result
+
+
+def bench_export_workbook(fixture):
+    # The background export that follows every registration
+    from registration_journal import write_excel
+    return timed(lambda: write_excel(fixture.records, "bench_export.xlsx"))
+
+
+def bench_create_ticket_pdf(fixture):
+    from ticket_renderer import create_ticket_pdf
+    ticket = {key: fixture.records[0][key] for key in ("name", "contact_number", "entry_no", "date", "day", "time")}
+    return timed(lambda: create_ticket_pdf("bench_ticket.pdf", "Helvetica", **ticket))
+
+
+def bench_load_tokens(fixture):
+    # A room starting up: reads the whole day's journal into its pending queue
+    from room_controller import CandidateIndex
+    return timed(lambda index: index.refresh(), lambda: CandidateIndex(None))
+
+
+def bench_call_next(fixture):
+    from room_controller import CandidateIndex
+    from queue_store import QueueStore
+    candidates = CandidateIndex(None)
+    store = QueueStore()
+    candidates.refresh()
+    rooms = iter(range(10 ** 9))
+
+    def run():
+        candidates.refresh()
+        store.claim_next(f"Room {next(rooms) % ROOMS + 1}", candidates.pending)
+    result = timed(run)
+    store.close()
+    return result
+
+
+def bench_display_refresh(fixture):
+    # CentralDisplayApp.read_state on a changed queue_state.json
+    app = load_app("Central Display.py", "central_display").CentralDisplayApp
+    return timed(lambda state: app.read_state(state), lambda: SimpleNamespace(state_stat=None))
+
+
+def bench_excel_to_html(fixture):
+    viewer = load_app("Record Viewer.py", "record_viewer")
+    from app_files import EXCEL_FILE
+    return timed(lambda: viewer.excel_to_html(EXCEL_FILE))
+
+
+# (name, benchmark, depends on the row count)
+BENCHMARKS = [
+    ("get_last_ticket_number", bench_get_last_ticket_number, True),
+    ("generate_ticket_persist", bench_generate_ticket_persist, True),
+    ("export_workbook", bench_export_workbook, True),
+    ("create_ticket_pdf", bench_create_ticket_pdf, False),
+    ("load_tokens", bench_load_tokens, True),
+    ("call_next", bench_call_next, True),
+    ("display_refresh", bench_display_refresh, True),
+    ("excel_to_html", bench_excel_to_html, True),
+]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, only=None):
+    results = {}
+    for size in sizes:
+        workdir = tempfile.mkdtemp(prefix="ktech-bench-")
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            fixture = Fixture(size)
+            for name, bench, scales in BENCHMARKS:
+                if only and name not in only:
+                    continue
+                # Row-count independent paths are measured once, with the smallest fixture
+                if not scales and size != sizes[0]:
+                    continue
+                key = f"{name}@{size if scales else 1}"
+                results[key] = bench(fixture)
+                print(f"{key:<32} median {results[key]['median_s'] * 1000:10.3f} ms"
+                      f"   min {results[key]['min_s'] * 1000:10.3f} ms   ({results[key]['repeats']} runs)", flush=True)
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    # Returns the keys that got slower than the threshold allows
+    regressions = []
+    print()
+    print(f"{'benchmark':<32} {'baseline ms':>12} {'now ms':>12} {'change':>8}")
+    for key, result in current["results"].items():
+        before = baseline["results"].get(key)
+        if before is None:
+            print(f"{key:<32} {'-':>12} {result['median_s'] * 1000:>12.3f}      new")
+            continue
+        old, new = before["median_s"], result["median_s"]
+        change = (new - old) / old if old else 0.0
+        flag = ""
+        if change > threshold and new - old > NOISE_FLOOR:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        elif change < -threshold and old - new > NOISE_FLOOR:
+            flag = "  faster"
+        print(f"{key:<32} {old * 1000:>12.3f} {new * 1000:>12.3f} {change:>+8.0%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths on generated data and check for regressions.")
+    parser.add_argument("--sizes", type=int, nargs="*", default=SIZES, help="rows in the generated day")
+    parser.add_argument("--only", nargs="*", help="run only these benchmarks")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, help="save the results as a baseline JSON file")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, help="compare against a baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="relative slowdown of the median flagged as a regression (default 0.25)")
+    args = parser.parse_args(argv)
+
+    change_notify.disable()
+    current = run_suite(sorted(args.sizes), set(args.only) if args.only else None)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"\nBaseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.compare} (commit {baseline['meta'].get('commit')})")
+            return 1
+        print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
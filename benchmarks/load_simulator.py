@@ -0,0 +1,454 @@
+import argparse
+import heapq
+import importlib.util
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import change_notify
+from app_files import JOURNAL_FILE, EXCEL_FILE, TICKET_FOLDER, COUNTER_DB, STATE_DB, STATE_FILE
+from registration_journal import RegistrationJournal, ExcelExporter
+from ticket_counter import TicketCounter
+from queue_store import QueueStore
+from queue_engine import QueueEngine, RegistrationDesk, read_state_file, board_rows, upcoming_tokens
+
+# Event day defaults: 5,000 registrations over an 8 hour day, 20 rooms, 2 display boards
+REGISTRATIONS = 5000
+ROOMS = 20
+DISPLAYS = 2
+DESKS = 2
+DAY_MINUTES = 480
+SERVICE_MINUTES = 1.8  # average interview length; 20 rooms at 1.8 min keep up with 5,000 in 8 h
+IDLE_RETRY_SECONDS = 30  # an idle room presses Call Next again after this long (virtual time)
+REAL_SECONDS = 30  # the concurrent run squeezes the day into this many real seconds
+STARTUP_SECONDS = 3  # head start for the worker processes to load before the day begins
+DISPLAY_POLL_SECONDS = 0.05
+
+
+def load_display_app():
+    # "Central Display.py" has a space in its name, so it is loaded by path
+    spec = importlib.util.spec_from_file_location("central_display", os.path.join(ROOT, "Central Display.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.CentralDisplayApp
+
+
+class Component:
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.cpu = 0.0
+
+    def run(self, fn, *args):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        result = fn(*args)
+        self.cpu += time.thread_time() - cpu
+        self.latencies.append(time.perf_counter() - wall)
+        return result
+
+    def report(self):
+        values = sorted(self.latencies)
+        if not values:
+            return {"count": 0}
+
+        def pct(fraction):
+            return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+        return {"count": len(values), "p50_ms": pct(0.5), "p95_ms": pct(0.95), "p99_ms": pct(0.99),
+                "max_ms": values[-1] * 1000, "mean_ms": statistics.mean(values) * 1000, "cpu_s": self.cpu}
+
+
+# --- The real data paths of the three apps, without their windows ---
+class Desk:
+    # Candidates POS.generate_ticket minus the dialogs
+    def __init__(self, name, journal, exporter, render_tickets):
+        self.counter = TicketCounter(COUNTER_DB, name)
+        self.journal = journal
+        self.exporter = exporter
+        self.render_tickets = render_tickets
+
+    def register(self, index):
+        now = datetime.now()
+        entry_no = self.counter.next_number()
+        record = {"date": now.strftime("%Y-%m-%d"), "day": now.strftime("%A"), "time": now.strftime("%H:%M:%S"),
+                  "name": f"Candidate {index}", "contact_number": f"9{index:09d}", "entry_no": entry_no}
+        self.journal.append(record)
+        self.exporter.request_export()
+        if self.render_tickets:
+            from ticket_renderer import create_ticket_pdf
+            folder = os.path.join(TICKET_FOLDER, f"{record['date']} - Entries")
+            os.makedirs(folder, exist_ok=True)
+            pdf_path = os.path.join(folder, f"Entry_{entry_no}_Candidate_{index}.pdf")
+            ticket = {key: record[key] for key in ("name", "contact_number", "entry_no", "date", "day", "time")}
+            create_ticket_pdf(pdf_path, "Helvetica", **ticket)
+        return entry_no
+
+
+class Room:
+    # The queue engine behind TokenCallerApp; each room has its own reader and connection,
+    # as it would running in its own process
+    def __init__(self, name):
+        self.name = name
+        self.engine = QueueEngine(journal_file=JOURNAL_FILE, state_db=STATE_DB, state_file=STATE_FILE)
+        self.store = self.engine.store
+
+    def call_next(self):
+        return self.engine.call_next(self.name)
+
+
+class Display:
+    # CentralDisplayApp.read_state: the stat check and parse a board does on every change
+    def __init__(self, app_class):
+        self.read_state = app_class.read_state
+        self.state = SimpleNamespace(state_stat=None)
+
+    def refresh(self):
+        return self.read_state(self.state)
+
+
+def file_sizes():
+    sizes = {}
+    for name in (JOURNAL_FILE, EXCEL_FILE, STATE_FILE, STATE_DB, STATE_DB + "-wal", COUNTER_DB):
+        if os.path.exists(name):
+            sizes[name] = os.path.getsize(name)
+    total = 0
+    for folder, _, files in os.walk(TICKET_FOLDER):
+        total += sum(os.path.getsize(os.path.join(folder, f)) for f in files)
+    sizes[TICKET_FOLDER + "/"] = total
+    return sizes
+
+
+def simulate_sequential(args):
+    # One thread on a virtual clock: exact candidate waits, but nothing ever runs at the same time
+    rng = random.Random(args.seed)
+    journal = RegistrationJournal(JOURNAL_FILE)
+    open(JOURNAL_FILE, "a").close()
+    exporter = ExcelExporter(journal, EXCEL_FILE, TICKET_FOLDER)
+    desks = [Desk(f"Desk {i + 1}", journal, exporter, args.tickets) for i in range(args.desks)]
+    rooms = [Room(f"Room {i + 1}") for i in range(args.rooms)]
+    display_class = load_display_app()
+    displays = [Display(display_class) for _ in range(args.displays)]
+
+    registration = Component("registration")
+    calling = Component("call_next")
+    display = Component("display refresh")
+
+    # Virtual clock: events run in time order, each one executes the real code and is timed for real
+    events = []
+    sequence = 0
+    day_seconds = args.minutes * 60
+    arrivals = sorted(rng.uniform(0, day_seconds) for _ in range(args.registrations))
+    for i, at in enumerate(arrivals):
+        events.append((at, sequence, "arrive", i))
+        sequence += 1
+    for i in range(args.rooms):
+        events.append((rng.uniform(0, IDLE_RETRY_SECONDS), sequence, "call", i))
+        sequence += 1
+    heapq.heapify(events)
+
+    registered = []
+    calls = []
+    waits = []
+    arrival_at = {}
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    while events:
+        at, _, kind, index = heapq.heappop(events)
+        if kind == "arrive":
+            desk = desks[index % len(desks)]
+            entry_no = registration.run(desk.register, index)
+            registered.append(entry_no)
+            arrival_at[entry_no] = at
+            continue
+
+        room = rooms[index]
+        claimed = calling.run(room.call_next)
+        if claimed is None:
+            # Nothing waiting: try again later, unless the day is over and everyone has been seen
+            if at < day_seconds or len(calls) < len(registered):
+                heapq.heappush(events, (at + IDLE_RETRY_SECONDS, sequence, "call", index))
+                sequence += 1
+            continue
+        calls.append((claimed["token"], room.name))
+        waits.append(at - arrival_at.get(claimed["token"], at))
+        # Every board re-reads queue_state.json after a call, as the change notification would make it
+        for board in displays:
+            display.run(board.refresh)
+        service = rng.expovariate(1 / (args.service_minutes * 60))
+        heapq.heappush(events, (at + service, sequence, "call", index))
+        sequence += 1
+
+    foreground_cpu = registration.cpu + calling.cpu + display.cpu
+    exporter.close()
+    total_cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    called_tokens = [token for token, _ in calls]
+    duplicates = len(called_tokens) - len(set(called_tokens))
+    lost = sorted(set(registered) - set(called_tokens))
+    db_calls = rooms[0].store.conn.execute("SELECT COUNT(*) FROM called_tokens").fetchone()[0]
+    for room in rooms:
+        room.store.close()
+    waits.sort()
+    return {
+        "mode": "sequential",
+        "registrations": len(registered),
+        "rooms": args.rooms,
+        "displays": args.displays,
+        "calls": len(calls),
+        "calls_in_db": db_calls,
+        "duplicate_calls": duplicates,
+        "lost_tokens": len(lost),
+        "candidate_wait_min": {
+            "mean": statistics.mean(waits) / 60 if waits else 0,
+            "p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] / 60 if waits else 0,
+        },
+        "latency": {c.name: c.report() for c in (registration, calling, display)},
+        "cpu_s": {
+            "registration": registration.cpu,
+            "call_next": calling.cpu,
+            "display refresh": display.cpu,
+            "background (Excel export, daily copy)": max(0.0, total_cpu - foreground_cpu),
+        },
+        "wall_s": wall,
+        "file_sizes": file_sizes(),
+    }
+
+
+# --- Concurrent run: every desk, room and display board in its own process, sharing the files ---
+def _worker_setup(workdir):
+    os.chdir(workdir)
+    change_notify.disable()
+
+
+def desk_process(workdir, name, indices, arrivals, start_at, render_tickets, results):
+    # The POS: RegistrationDesk with its own journal writer, counter connection and workbook exporter
+    _worker_setup(workdir)
+    desk = RegistrationDesk(name)
+    component = Component("registration")
+    registered = []
+    errors = 0
+    for index, at in zip(indices, arrivals):
+        delay = start_at + at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            record, pdf_path = component.run(desk.register, f"Candidate {index}", f"9{index:09d}")
+        except sqlite3.Error:
+            errors += 1
+            continue
+        registered.append((record["entry_no"], time.time()))
+        if render_tickets:
+            from ticket_renderer import create_ticket_pdf
+            ticket = {key: record[key] for key in ("name", "contact_number", "entry_no", "date", "day", "time")}
+            create_ticket_pdf(pdf_path, "Helvetica", **ticket)
+    desk.close()
+    results.put({"kind": "desk", "latencies": component.latencies, "cpu": component.cpu,
+                 "process_cpu": time.process_time(), "registered": registered, "errors": errors,
+                 "export_error": repr(desk.exporter.last_error) if desk.exporter.last_error else None})
+
+
+def room_process(workdir, name, start_at, service_seconds, idle_seconds, seed, desks_done, results):
+    # TokenCallerApp's engine pressing Call Next, interviewing, and pressing it again
+    _worker_setup(workdir)
+    rng = random.Random(seed)
+    engine = QueueEngine()
+    component = Component("call_next")
+    calls = []
+    errors = 0
+    time.sleep(max(0.0, start_at - time.time()))
+    while True:
+        try:
+            claimed = component.run(engine.call_next, name)
+        except sqlite3.Error:
+            errors += 1
+            time.sleep(idle_seconds)
+            continue
+        if claimed is None:
+            # Everyone registered has been called once the desks are done and the queue is empty
+            if desks_done.is_set():
+                break
+            time.sleep(idle_seconds)
+            continue
+        calls.append((claimed["token"], name, time.time()))
+        time.sleep(rng.expovariate(1 / service_seconds))
+    engine.close()
+    results.put({"kind": "room", "latencies": component.latencies, "cpu": component.cpu,
+                 "process_cpu": time.process_time(), "calls": calls, "errors": errors})
+
+
+def display_process(workdir, rooms_done, results):
+    # CentralDisplayApp.read_state: re-read queue_state.json whenever it changed
+    _worker_setup(workdir)
+    component = Component("display refresh")
+    stat_key = None
+    while not rooms_done.is_set():
+        wall, cpu = time.perf_counter(), time.thread_time()
+        stat_key, state = read_state_file(STATE_FILE, stat_key)
+        if state is not None:
+            board_rows(state)
+            upcoming_tokens(state)
+            component.cpu += time.thread_time() - cpu
+            component.latencies.append(time.perf_counter() - wall)
+        time.sleep(DISPLAY_POLL_SECONDS)
+    results.put({"kind": "display", "latencies": component.latencies, "cpu": component.cpu,
+                 "process_cpu": time.process_time(), "errors": 0})
+
+
+def simulate_processes(args):
+    workdir = os.getcwd()
+    rng = random.Random(args.seed)
+    scale = args.seconds / (args.minutes * 60)  # real seconds per simulated second
+    arrivals = sorted(rng.uniform(0, args.seconds) for _ in range(args.registrations))
+    # The files exist as they do after the first start of the day; the run is about the calls and writes
+    open(JOURNAL_FILE, "a").close()
+    QueueStore(STATE_DB, STATE_FILE).close()
+    TicketCounter(COUNTER_DB).close()
+
+    ctx = multiprocessing.get_context()
+    results = ctx.Queue()
+    desks_done, rooms_done = ctx.Event(), ctx.Event()
+    start_at = time.time() + STARTUP_SECONDS
+    desks = [ctx.Process(target=desk_process, args=(workdir, f"Desk {d + 1}", list(range(d, args.registrations, args.desks)),
+                                                    arrivals[d::args.desks], start_at, args.tickets, results))
+             for d in range(args.desks)]
+    rooms = [ctx.Process(target=room_process, args=(workdir, f"Room {i + 1}", start_at, args.service_minutes * 60 * scale,
+                                                    IDLE_RETRY_SECONDS * scale, args.seed + i, desks_done, results))
+             for i in range(args.rooms)]
+    displays = [ctx.Process(target=display_process, args=(workdir, rooms_done, results)) for _ in range(args.displays)]
+    for process in desks + rooms + displays:
+        process.start()
+
+    # Results are read as they come, before joining: a process can't exit while its queue data is unread
+    reports = {"desk": [], "room": [], "display": []}
+    while len(reports["room"]) < len(rooms) or len(reports["display"]) < len(displays):
+        report = results.get()
+        reports[report["kind"]].append(report)
+        if len(reports["desk"]) == len(desks):
+            desks_done.set()
+        if len(reports["room"]) == len(rooms):
+            rooms_done.set()
+    for process in desks + rooms + displays:
+        process.join()
+    wall = time.time() - start_at
+
+    def merged(name, kind):
+        component = Component(name)
+        for report in reports[kind]:
+            component.latencies.extend(report["latencies"])
+            component.cpu += report["cpu"]
+        return component
+    registration, calling, display = merged("registration", "desk"), merged("call_next", "room"), merged("display refresh", "display")
+
+    registered_at = dict(entry for report in reports["desk"] for entry in report["registered"])
+    calls = [call for report in reports["room"] for call in report["calls"]]
+    called_tokens = [token for token, _, _ in calls]
+    waits = sorted((called - registered_at.get(token, called)) / scale for token, _, called in calls)
+    conn = sqlite3.connect(STATE_DB)
+    db_calls = conn.execute("SELECT COUNT(*) FROM called_tokens").fetchone()[0]
+    conn.close()
+    return {
+        "mode": "processes",
+        "registrations": len(registered_at),
+        "rooms": args.rooms,
+        "displays": args.displays,
+        "calls": len(calls),
+        "calls_in_db": db_calls,
+        "duplicate_calls": len(called_tokens) - len(set(called_tokens)),
+        "lost_tokens": len(set(registered_at) - set(called_tokens)),
+        "errors": {kind: sum(r["errors"] for r in items) for kind, items in reports.items()},
+        "export_errors": [r["export_error"] for r in reports["desk"] if r["export_error"]],
+        "candidate_wait_min": {
+            "mean": statistics.mean(waits) / 60 if waits else 0,
+            "p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] / 60 if waits else 0,
+        },
+        "latency": {c.name: c.report() for c in (registration, calling, display)},
+        "cpu_s": {
+            "registration": registration.cpu,
+            "call_next": calling.cpu,
+            "display refresh": display.cpu,
+            "background (Excel export, daily copy)": max(0.0, sum(r["process_cpu"] for r in reports["desk"]) - registration.cpu),
+        },
+        "wall_s": wall,
+        "file_sizes": file_sizes(),
+    }
+
+
+def print_report(result):
+    mode = "each in its own process" if result["mode"] == "processes" else "one after another (virtual clock)"
+    print(f"{result['registrations']} registrations, {result['rooms']} rooms, {result['displays']} displays, "
+          f"{mode}, in {result['wall_s']:.1f} s")
+    print(f"calls: {result['calls']} (in database: {result['calls_in_db']}), "
+          f"duplicates: {result['duplicate_calls']}, lost: {result['lost_tokens']}")
+    if "errors" in result:
+        errors = result["errors"]
+        print(f"database errors: desks {errors['desk']}, rooms {errors['room']}, displays {errors['display']}; "
+              f"workbook export errors: {len(result['export_errors'])}")
+    wait = result["candidate_wait_min"]
+    print(f"simulated candidate wait: mean {wait['mean']:.1f} min, p95 {wait['p95']:.1f} min")
+    print()
+    print(f"{'component':<18} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'CPU s':>7}")
+    for name, stats in result["latency"].items():
+        if not stats["count"]:
+            continue
+        print(f"{name:<18} {stats['count']:>7} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+              f"{stats['p99_ms']:>8.2f} {stats['max_ms']:>8.1f} {stats['cpu_s']:>7.2f}")
+    print(f"{'background export':<18} {'':>7} {'':>8} {'':>8} {'':>8} {'':>8} "
+          f"{result['cpu_s']['background (Excel export, daily copy)']:>7.2f}")
+    print()
+    for name, size in result["file_sizes"].items():
+        print(f"{name:<28} {size / 1024:>10.1f} KiB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate an event day against a temporary copy of the queue files.")
+    parser.add_argument("--registrations", type=int, default=REGISTRATIONS)
+    parser.add_argument("--rooms", type=int, default=ROOMS)
+    parser.add_argument("--displays", type=int, default=DISPLAYS)
+    parser.add_argument("--desks", type=int, default=DESKS)
+    parser.add_argument("--minutes", type=float, default=DAY_MINUTES, help="length of the registration window")
+    parser.add_argument("--service-minutes", type=float, default=SERVICE_MINUTES, help="average interview length")
+    parser.add_argument("--tickets", action="store_true", help="also render every entry pass PDF (slow)")
+    parser.add_argument("--seconds", type=float, default=REAL_SECONDS,
+                        help="real length of the day in the concurrent run (interviews are scaled to match)")
+    parser.add_argument("--sequential", action="store_true",
+                        help="run everything in one thread on a virtual clock instead of one process per app")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary folder for inspection")
+    args = parser.parse_args(argv)
+
+    # Everything runs in a scratch folder, and no change notifications leave this process
+    change_notify.disable()
+    json_path = os.path.abspath(args.json) if args.json else None
+    workdir = tempfile.mkdtemp(prefix="ktech-sim-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        result = simulate_sequential(args) if args.sequential else simulate_processes(args)
+    finally:
+        os.chdir(cwd)
+        if args.keep:
+            print(f"Files kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(result)
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(result, f, indent=2)
+    return 1 if result["duplicate_calls"] or result["lost_tokens"] or any(result.get("errors", {}).values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pending_queue import PendingQueue
+
+# Per-call cost of picking the next token when `depth` tokens were already called today.
+# "list scan" is the original call_next, "set scan" the previous QueueStore.claim_next.
+SIZES = [1000, 5000, 10000, 25000, 50000]
+LIST_SCAN_LIMIT = 10000  # the O(n²) version takes minutes beyond this
+LIST_SCAN_CALLS = 5
+SAMPLE_CALLS = 200
+
+
+def make_candidates(count):
+    return [{"token": i, "name": f"Candidate {i}", "date": "2025-01-01", "time": "09:00:00"}
+            for i in range(1, count + 1)]
+
+
+def list_scan(candidates, depth, calls):
+    called = [t["token"] for t in candidates[:depth]]
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        token = next(t for t in candidates if t["token"] not in called)
+        called.append(token["token"])
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def set_scan(candidates, depth, calls):
+    called = {t["token"] for t in candidates[:depth]}
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        token = next(t for t in candidates if t["token"] not in called)
+        called.add(token["token"])
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def pending_queue(candidates, depth, calls):
+    pending = PendingQueue()
+    pending.add_many(candidates)
+    for _ in range(depth):
+        pending.pop_next()
+    timings = []
+    for i in range(calls):
+        start = time.perf_counter()
+        # A room skipping a no-show now and then, plus a new arrival, as on a real day
+        if i % 10 == 0:
+            pending.skip(pending.peek()["token"])
+        pending.pop_next()
+        pending.add({"token": len(candidates) + i + 1, "name": "Walk-in", "date": "2025-01-01", "time": "09:00:00"})
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    return statistics.mean(timings) * 1e6, p99 * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark call_next token selection against queue length.")
+    parser.add_argument("--sizes", type=int, nargs="*", default=SIZES, help="tokens registered for the day")
+    parser.add_argument("--calls", type=int, default=SAMPLE_CALLS, help="timed calls per size")
+    args = parser.parse_args(argv)
+
+    print(f"{'tokens':>8} | {'list scan mean/p99 (µs)':>24} | {'set scan mean/p99 (µs)':>23} | {'PendingQueue mean/p99 (µs)':>27}")
+    for size in args.sizes:
+        candidates = make_candidates(size)
+        # Time the calls at the end of the day, when the scans have the most to skip
+        depth = max(0, size - args.calls * 2)
+        results = []
+        for name, fn in (("list", list_scan), ("set", set_scan), ("queue", pending_queue)):
+            if name == "list" and size > LIST_SCAN_LIMIT:
+                results.append("skipped")
+                continue
+            calls = min(args.calls, LIST_SCAN_CALLS) if name == "list" else args.calls
+            mean, p99 = summarize(fn(candidates, depth, calls))
+            results.append(f"{mean:10.1f} / {p99:10.1f}")
+        print(f"{size:>8} | {results[0]:>24} | {results[1]:>23} | {results[2]:>27}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
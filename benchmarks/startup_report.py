@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = ["Candidates POS.py", "Interview Rooms.py", "Central Display.py", "Record Viewer.py", "queue_engine.py"]
+HEAVY_MODULES = ["openpyxl", "reportlab", "qrcode", "PIL"]
+RUNS = 5
+
+# Loads an app script the way `python <script>` would, minus the mainloop (__name__ isn't "__main__")
+IMPORT_PROBE = """
+import importlib, importlib.util, json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+for module in {preload!r}:
+    importlib.import_module(module)
+spec = importlib.util.spec_from_file_location("app_under_test", {path!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "heavy": sorted({{m.split(".")[0] for m in sys.modules}} & set({heavy!r}))}}))
+"""
+
+# The window font and PDF font probes of an app start, against the font cache in the current folder
+FONT_PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+import font_cache
+result = {{}}
+start = time.perf_counter()
+font_cache.pick_pdf_font()
+result["pdf"] = time.perf_counter() - start
+try:
+    import tkinter as tk
+    root = tk.Tk()
+    root.withdraw()
+except Exception:
+    result["tk"] = None
+else:
+    start = time.perf_counter()
+    font_cache.pick_preferred_font(root)
+    result["tk"] = time.perf_counter() - start
+    root.destroy()
+print(json.dumps(result))
+"""
+
+
+def run_probe(code, cwd):
+    output = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def time_import(app, cwd, runs, eager):
+    # eager: import the heavy libraries first, as every app did before they were deferred
+    code = IMPORT_PROBE.format(root=ROOT, path=os.path.join(ROOT, app), heavy=HEAVY_MODULES,
+                               preload=["openpyxl", "reportlab.pdfgen.canvas", "qrcode"] if eager else [])
+    results = [run_probe(code, cwd) for _ in range(runs)]
+    return {"median_s": statistics.median(r["seconds"] for r in results), "heavy": results[-1]["heavy"]}
+
+
+def time_fonts(cwd, runs):
+    cache = os.path.join(cwd, "config", "font_cache.json")
+    cold, cached = [], []
+    for _ in range(runs):
+        if os.path.exists(cache):
+            os.remove(cache)
+        cold.append(run_probe(FONT_PROBE.format(root=ROOT), cwd))
+        cached.append(run_probe(FONT_PROBE.format(root=ROOT), cwd))
+
+    def median(results, key):
+        values = [r[key] for r in results if r[key] is not None]
+        return statistics.median(values) if values else None
+    return {"cold": {"pdf_s": median(cold, "pdf"), "tk_s": median(cold, "tk")},
+            "cached": {"pdf_s": median(cached, "pdf"), "tk_s": median(cached, "tk")}}
+
+
+def ms(seconds):
+    return "n/a (no display)" if seconds is None else f"{seconds * 1000:8.1f} ms"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report how long each app takes to load and probe its fonts.")
+    parser.add_argument("--runs", type=int, default=RUNS, help="fresh interpreter starts per measurement")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="ktech-startup-")
+    try:
+        report = {"imports": {}, "fonts": None}
+        for app in APPS:
+            report["imports"][app] = {"deferred": time_import(app, workdir, args.runs, False),
+                                      "eager": time_import(app, workdir, args.runs, True)}
+        report["fonts"] = time_fonts(workdir, args.runs)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    print(f"Module load, median of {args.runs} fresh interpreters (eager = openpyxl, reportlab and qrcode loaded up front)")
+    print(f"{'app':<22} {'deferred':>11} {'eager':>11} {'saved':>11}  heavy libraries loaded at start")
+    for app, result in report["imports"].items():
+        deferred, eager = result["deferred"]["median_s"], result["eager"]["median_s"]
+        heavy = ", ".join(result["deferred"]["heavy"]) or "none"
+        print(f"{app:<22} {deferred * 1000:8.1f} ms {eager * 1000:8.1f} ms {(eager - deferred) * 1000:8.1f} ms  {heavy}")
+    fonts = report["fonts"]
+    print()
+    print(f"{'font probe':<22} {'no cache':>16} {'cached':>16}")
+    print(f"{'window (Tk families)':<22} {ms(fonts['cold']['tk_s']):>16} {ms(fonts['cached']['tk_s']):>16}")
+    print(f"{'ticket PDF (TTF)':<22} {ms(fonts['cold']['pdf_s']):>16} {ms(fonts['cached']['pdf_s']):>16}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+import argparse
+import csv
+import multiprocessing
+import os
+import re
+import sys
+from datetime import datetime
+from app_files import TICKET_FOLDER
+from routing import load_routing_config
+
+NAME_COLUMNS = {"candidate name", "name", "candidate"}
+CONTACT_COLUMNS = {"contact number", "contact", "phone", "phone number", "mobile", "mobile number"}
+ROLE_COLUMNS = {"role", "position", "applied for"}
+CONTACT_PATTERN = re.compile(r"^\+?[0-9][0-9 \-]{5,19}$")
+
+
+class BulkImportError(Exception):
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def _read_table(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return [row for row in csv.reader(f)]
+    if ext in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True, data_only=True)
+        rows = [list(row) for row in wb.active.iter_rows(values_only=True)]
+        wb.close()
+        return rows
+    raise BulkImportError(f"Unsupported file type '{ext}'. Use a .csv or .xlsx file.")
+
+
+def _find_column(header, names):
+    for index, value in enumerate(header):
+        if str(value or "").strip().lower() in names:
+            return index
+    return None
+
+
+def read_candidates(path, routing=None):
+    # Returns [(sheet_row_number, name, contact_number, role)]; raises BulkImportError listing every bad row.
+    # With several roles in config/routing.json every row needs one of them.
+    routing = routing or load_routing_config()
+    rows = _read_table(path)
+    if not rows:
+        raise BulkImportError("The file is empty.")
+    header = rows[0]
+    name_col = _find_column(header, NAME_COLUMNS)
+    contact_col = _find_column(header, CONTACT_COLUMNS)
+    if name_col is None or contact_col is None:
+        raise BulkImportError("The first row must have 'Candidate Name' and 'Contact Number' columns.")
+    # Optional: the role each candidate applied for, used to route them to the right rooms
+    role_col = _find_column(header, ROLE_COLUMNS)
+    if role_col is None and len(routing.role_names()) > 1:
+        raise BulkImportError(f"The first row needs a 'Role' column: one of {', '.join(routing.role_names())}.")
+
+    candidates = []
+    errors = []
+    for row_number, row in enumerate(rows[1:], start=2):
+        cells = list(row) + [None] * (max(name_col, contact_col, role_col or 0) + 1 - len(row))
+        name = str(cells[name_col] or "").strip()
+        contact_number = cells[contact_col]
+        # Excel stores phone numbers typed as numbers as floats/ints
+        if isinstance(contact_number, float) and contact_number.is_integer():
+            contact_number = int(contact_number)
+        contact_number = str(contact_number or "").strip()
+        role = str(cells[role_col] or "").strip() if role_col is not None else ""
+        if not name and not contact_number:
+            continue
+        if not name:
+            errors.append(f"Row {row_number}: candidate name is missing.")
+        elif not contact_number:
+            errors.append(f"Row {row_number}: contact number is missing for {name}.")
+        elif not CONTACT_PATTERN.match(contact_number):
+            errors.append(f"Row {row_number}: '{contact_number}' is not a valid contact number.")
+        else:
+            try:
+                candidates.append((row_number, name, contact_number, routing.check_role(role)))
+            except ValueError as e:
+                errors.append(f"Row {row_number}: {e}")
+
+    if errors:
+        raise BulkImportError(f"{len(errors)} row(s) need fixing before importing.", errors)
+    if not candidates:
+        raise BulkImportError("No candidates found in the file.")
+    return candidates
+
+
+def build_records(candidates, first_entry_no, now=None, ticket_folder=TICKET_FOLDER):
+    # Consecutive entry numbers from first_entry_no; same record, folder and PDF naming as the POS
+    now = now or datetime.now()
+    date = now.strftime("%Y-%m-%d")
+    day = now.strftime("%A")
+    time = now.strftime("%H:%M:%S")
+    file_time = now.strftime("%H-%M-%S")
+    folder_name = os.path.join(ticket_folder, f"{date} - Entries")
+
+    records = []
+    jobs = []
+    for offset, (_, name, contact_number, role) in enumerate(candidates):
+        entry_no = first_entry_no + offset
+        records.append({
+            "date": date,
+            "day": day,
+            "time": time,
+            "name": name,
+            "contact_number": contact_number,
+            "entry_no": entry_no,
+            "role": role
+        })
+        safe_name = name.replace(" ", "_")
+        pdf_path = os.path.join(folder_name, f"Entry_{entry_no}_{safe_name}_{file_time}.pdf")
+        jobs.append((pdf_path, {
+            "name": name,
+            "contact_number": contact_number,
+            "entry_no": entry_no,
+            "date": date,
+            "day": day,
+            "time": time,
+            "role": role
+        }))
+    os.makedirs(folder_name, exist_ok=True)
+    return records, jobs
+
+
+def main(argv=None):
+    from ticket_renderer import register_pdf_font, render_tickets_parallel
+    # queue_engine imports build_records from here, so the desk is imported on use
+    from queue_engine import RegistrationDesk
+
+    parser = argparse.ArgumentParser(description="Pre-register a shortlist of candidates and print their entry passes.")
+    parser.add_argument("file", help="CSV or XLSX file with 'Candidate Name' and 'Contact Number' columns (and optionally 'Role')")
+    parser.add_argument("--workers", type=int, default=None, help="PDF render processes (default: one per CPU core)")
+    args = parser.parse_args(argv)
+
+    try:
+        candidates = read_candidates(args.file)
+    except BulkImportError as e:
+        print(e, file=sys.stderr)
+        for error in e.errors:
+            print("  " + error, file=sys.stderr)
+        return 1
+
+    # The same desk as the POS: the first start of the day empties yesterday's journal and records
+    # the date, so a shortlist imported before the POS opens isn't cleared when it does
+    desk = RegistrationDesk()
+    records, jobs = desk.register_many(candidates)
+    print(f"Registered entries {records[0]['entry_no']}-{records[-1]['entry_no']} ({len(records)} candidates).")
+
+    render_tickets_parallel(jobs, register_pdf_font(), args.workers)
+    desk.close()
+    print(f"Entry passes written to {os.path.dirname(jobs[0][0])}")
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import socket
+import threading
+
+# Change notifications go out as tiny UDP multicast datagrams, so every app on the
+# local network (and every app on this PC) hears about a change as soon as it happens.
+NOTIFY_GROUP = "239.255.77.77"
+NOTIFY_PORT = 50577
+NOTIFY_PREFIX = b"ktech-queue:"
+
+TOPIC_JOURNAL = "journal"      # candidate_journal.jsonl got a new entry or was reset
+TOPIC_WORKBOOK = "workbook"    # candidate_list.xlsx was re-exported
+TOPIC_QUEUE = "queue"          # a room called a token / queue_state.json changed
+
+_sender = None
+_sender_lock = threading.Lock()
+_enabled = True
+
+
+def disable():
+    # For offline tools (simulations, benchmarks), so they don't wake the real apps on the network
+    global _enabled
+    _enabled = False
+
+
+def notify(topic):
+    global _sender
+    if not _enabled:
+        return
+    # Best effort: a missed datagram is covered by the consumers' fallback polling
+    try:
+        with _sender_lock:
+            if _sender is None:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+                _sender = sock
+            _sender.sendto(NOTIFY_PREFIX + topic.encode("ascii"), (NOTIFY_GROUP, NOTIFY_PORT))
+    except OSError:
+        pass
+
+
+class ChangeListener:
+    def __init__(self, topics):
+        self.topics = set(topics)
+        self.version = 0
+        self.active = False
+        self.cond = threading.Condition()
+        self.sock = None
+
+    def start(self):
+        if not _enabled:
+            return False
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(("", NOTIFY_PORT))
+            mreq = socket.inet_aton(NOTIFY_GROUP) + socket.inet_aton("0.0.0.0")
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+        except OSError:
+            # No multicast on this machine: callers stay on plain polling
+            return False
+        self.sock = sock
+        self.active = True
+        threading.Thread(target=self._run, name="ChangeListener", daemon=True).start()
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(256)
+            except OSError:
+                self.active = False
+                return
+            if not data.startswith(NOTIFY_PREFIX):
+                continue
+            topic = data[len(NOTIFY_PREFIX):].decode("ascii", "ignore")
+            if topic in self.topics:
+                with self.cond:
+                    self.version += 1
+                    self.cond.notify_all()
+
+    def wait_for_change(self, version, timeout=None):
+        with self.cond:
+            self.cond.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
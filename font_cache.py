@@ -0,0 +1,67 @@
+import json
+import os
+from app_files import CONFIG_FOLDER
+
+# Enumerating the system font families (tkfont.families) and probing the TTF files takes a noticeable
+# part of every app start, so the results are kept in config/. Delete the file after installing new fonts.
+FONT_CACHE = os.path.join(CONFIG_FOLDER, "font_cache.json")
+PREFERRED_FONTS = ["Montserrat", "Aptos", "Segoe UI", "Helvetica", "Arial"]
+PDF_FONTS = [
+    ("Montserrat", "C:\\Windows\\Fonts\\Montserrat-Regular.ttf"),
+    ("Aptos", "C:\\Windows\\Fonts\\Aptos.ttf"),
+]
+PDF_FALLBACK = "Helvetica"
+
+
+def load_cache(path=FONT_CACHE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache, path=FONT_CACHE):
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Read-only config folder: the fonts are simply probed again next time
+        pass
+
+
+# --- Tk window font ---
+def pick_preferred_font(root=None, preferred=PREFERRED_FONTS, path=FONT_CACHE):
+    cache = load_cache(path)
+    entry = cache.get("tk")
+    if entry and entry.get("preferred") == preferred:
+        return entry["family"]
+
+    import tkinter.font as tkfont
+    available = set(tkfont.families(root))
+    family = next((f for f in preferred if f in available), "TkDefaultFont")
+    cache["tk"] = {"preferred": preferred, "family": family}
+    save_cache(cache, path)
+    return family
+
+
+# --- PDF ticket font: (name, TTF path) or the built-in fallback with path None ---
+def pick_pdf_font(candidates=PDF_FONTS, path=FONT_CACHE):
+    cache = load_cache(path)
+    entry = cache.get("pdf")
+    if entry and entry.get("candidates") == [list(c) for c in candidates]:
+        # A cached TTF is checked with one stat, in case the font was uninstalled
+        if entry["path"] is None or os.path.exists(entry["path"]):
+            return entry["name"], entry["path"]
+
+    name, ttf_path = PDF_FALLBACK, None
+    for font_name, font_path in candidates:
+        if os.path.exists(font_path):
+            name, ttf_path = font_name, font_path
+            break
+    cache["pdf"] = {"candidates": [list(c) for c in candidates], "name": name, "path": ttf_path}
+    save_cache(cache, path)
+    return name, ttf_path
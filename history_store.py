@@ -0,0 +1,272 @@
+import argparse
+import glob
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+from app_files import HISTORY_FOLDER, JOURNAL_FILE, TICKET_FOLDER, ARCHIVE_FOLDER
+from sqlite_mode import set_journal_mode
+
+DEFAULT_DAYS = 90  # default look-back of history queries
+QUERY_LIMIT = 1000  # rows returned by one query at most
+PARTITION_PATTERN = re.compile(r"^history_(\d{4}-\d{2})\.db$")
+REGISTRATION_KEYS = ["date", "day", "time", "name", "contact_number", "entry_no", "role"]
+
+
+def contact_key(value):
+    # "+91 98400-12345" and "9840012345" are the same phone: compare the last 10 digits
+    digits = re.sub(r"\D", "", str(value or ""))
+    return digits[-10:]
+
+
+def month_of(date):
+    return str(date)[:7]
+
+
+# --- Every registration and call, kept forever in one SQLite file per month (History/history_YYYY-MM.db) ---
+# The live journal is emptied every morning and queue_state.db is archived, so this is the only place
+# that can answer questions across days. A query opens only the months it covers.
+class HistoryStore:
+    def __init__(self, folder=HISTORY_FOLDER):
+        self.folder = folder
+        self.lock = threading.Lock()
+        self.writers = {}  # month -> connection
+
+    def partition_path(self, month):
+        return os.path.join(self.folder, f"history_{month}.db")
+
+    def _writer(self, month):
+        conn = self.writers.get(month)
+        if conn is not None:
+            return conn
+        os.makedirs(self.folder, exist_ok=True)
+        conn = sqlite3.connect(self.partition_path(month), timeout=10, isolation_level=None, check_same_thread=False)
+        set_journal_mode(conn, self.partition_path(month))
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS registrations (
+                date TEXT NOT NULL,
+                day TEXT,
+                time TEXT,
+                name TEXT,
+                contact_number TEXT,
+                contact_key TEXT,
+                entry_no INTEGER,
+                role TEXT,
+                UNIQUE (date, entry_no, time, name)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS calls (
+                day TEXT NOT NULL,
+                token INTEGER NOT NULL,
+                name TEXT,
+                counter TEXT,
+                time TEXT,
+                timestamp TEXT NOT NULL,
+                UNIQUE (day, token, timestamp)
+            )
+        """)
+        # The UNIQUE constraints already index (date, entry_no) and (day, token)
+        conn.execute("CREATE INDEX IF NOT EXISTS registrations_contact ON registrations (contact_key, date)")
+        conn.execute("CREATE INDEX IF NOT EXISTS registrations_entry ON registrations (entry_no, date)")
+        conn.execute("CREATE INDEX IF NOT EXISTS calls_counter ON calls (counter, day)")
+        self.writers[month] = conn
+        return conn
+
+    def _write(self, rows_by_month, sql):
+        count = 0
+        with self.lock:
+            for month, rows in rows_by_month.items():
+                conn = self._writer(month)
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    before = conn.total_changes
+                    conn.executemany(sql, rows)
+                    count += conn.total_changes - before
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+        return count
+
+    def add_registrations(self, records):
+        # records: journal records; rows already stored (same day, number, time and name) are skipped
+        by_month = {}
+        for record in records:
+            if not record.get("date"):
+                continue
+            row = [record.get(key) for key in REGISTRATION_KEYS]
+            row.insert(5, contact_key(record.get("contact_number")))
+            by_month.setdefault(month_of(record["date"]), []).append(row)
+        return self._write(by_month, "INSERT OR IGNORE INTO registrations "
+                                     "(date, day, time, name, contact_number, contact_key, entry_no, role) "
+                                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+    def add_calls(self, day, calls):
+        # calls: dicts with token, name, counter, time, timestamp (as archived by queue_store)
+        rows = [(day, c["token"], c.get("name"), c.get("counter"), c.get("time"), c["timestamp"]) for c in calls]
+        return self._write({month_of(day): rows}, "INSERT OR IGNORE INTO calls "
+                                                  "(day, token, name, counter, time, timestamp) VALUES (?, ?, ?, ?, ?, ?)")
+
+    def close(self):
+        with self.lock:
+            for conn in self.writers.values():
+                conn.close()
+            self.writers = {}
+
+    # --- Queries: read-only, newest first, across the monthly partitions the date range touches ---
+    def months(self, date_from=None, date_to=None):
+        months = []
+        for path in glob.glob(os.path.join(self.folder, "history_*.db")):
+            match = PARTITION_PATTERN.match(os.path.basename(path))
+            if not match:
+                continue
+            month = match.group(1)
+            if (date_from and month < month_of(date_from)) or (date_to and month > month_of(date_to)):
+                continue
+            months.append(month)
+        return sorted(months, reverse=True)
+
+    def _query(self, months, sql, params, limit):
+        # A month that can't be read (locked, damaged) raises sqlite3.Error rather than quietly
+        # leaving its rows out of the results
+        results = []
+        for month in months:
+            conn = sqlite3.connect(f"file:{self.partition_path(month)}?mode=ro", uri=True, timeout=5)
+            conn.row_factory = sqlite3.Row
+            try:
+                results.extend(dict(row) for row in conn.execute(sql + " LIMIT ?", params + [limit - len(results)]))
+            except sqlite3.OperationalError as e:
+                # Only a partition that is being created right now has no tables (and no rows) yet
+                if "no such table" not in str(e):
+                    raise
+            finally:
+                conn.close()
+            if len(results) >= limit:
+                break
+        return results
+
+    def registrations(self, contact=None, entry_no=None, name=None, date_from=None, date_to=None,
+                      days=DEFAULT_DAYS, limit=QUERY_LIMIT):
+        # Each registration comes with the room and time it was called, if it was.
+        # Without a start date the last `days` days up to date_to (or today) are searched.
+        if date_from is None and days:
+            end = datetime.strptime(date_to, "%Y-%m-%d") if date_to else datetime.now()
+            date_from = (end - timedelta(days=days)).strftime("%Y-%m-%d")
+        conditions, params = [], []
+        if contact:
+            conditions.append("r.contact_key = ?")
+            params.append(contact_key(contact))
+        if entry_no is not None:
+            conditions.append("r.entry_no = ?")
+            params.append(int(entry_no))
+        if name:
+            conditions.append("r.name LIKE ?")
+            params.append(f"%{name}%")
+        if date_from:
+            conditions.append("r.date >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("r.date <= ?")
+            params.append(date_to)
+        where = " AND ".join(conditions) or "1"
+        sql = ("SELECT r.date, r.day, r.time, r.name, r.contact_number, r.entry_no, r.role, "
+               "c.counter AS called_by, c.time AS called_at "
+               "FROM registrations r LEFT JOIN calls c ON c.day = r.date AND c.token = r.entry_no "
+               f"WHERE {where} ORDER BY r.date DESC, r.time DESC")
+        return self._query(self.months(date_from, date_to), sql, params, limit)
+
+    def visits(self, contact, days=DEFAULT_DAYS):
+        return self.registrations(contact=contact, days=days)
+
+    def calls(self, day=None, counter=None, date_from=None, date_to=None, limit=QUERY_LIMIT):
+        conditions, params = [], []
+        if day:
+            date_from = date_to = day
+        if counter:
+            conditions.append("counter = ?")
+            params.append(counter)
+        if date_from:
+            conditions.append("day >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("day <= ?")
+            params.append(date_to)
+        where = " AND ".join(conditions) or "1"
+        sql = f"SELECT day, token, name, counter, time, timestamp FROM calls WHERE {where} ORDER BY day DESC, timestamp DESC"
+        return self._query(self.months(date_from, date_to), sql, params, limit)
+
+
+# --- One-time import of what earlier versions left behind ---
+def import_existing(store, journal_file=JOURNAL_FILE, ticket_folder=TICKET_FOLDER, archive_folder=ARCHIVE_FOLDER):
+    # Daily workbook copies, the current journal and the archived call logs; safe to run again
+    from openpyxl import load_workbook
+    from registration_journal import RECORD_KEYS
+    imported = {"registrations": 0, "calls": 0}
+    for path in sorted(glob.glob(os.path.join(ticket_folder, "* - Entries", "candidate_list_*.xlsx"))):
+        wb = load_workbook(path, read_only=True, data_only=True)
+        records = [dict(zip(RECORD_KEYS, row)) for row in wb.active.iter_rows(min_row=2, values_only=True)
+                   if row and row[0] is not None]
+        wb.close()
+        imported["registrations"] += store.add_registrations(records)
+    if os.path.exists(journal_file):
+        with open(journal_file, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        imported["registrations"] += store.add_registrations(records)
+    for path in sorted(glob.glob(os.path.join(archive_folder, "*", "queue_events.jsonl"))):
+        day = os.path.basename(os.path.dirname(path))
+        with open(path, "r", encoding="utf-8") as f:
+            calls = [json.loads(line) for line in f if line.strip()]
+        imported["calls"] += store.add_calls(day, calls)
+    return imported
+
+
+def run_command(store, args):
+    if args.command == "import":
+        imported = import_existing(store)
+        store.close()
+        print(f"Imported {imported['registrations']} registrations and {imported['calls']} calls into {args.folder}/")
+        return 0
+    if args.command == "visits":
+        rows = store.visits(args.contact, args.days)
+    else:
+        rows = store.registrations(entry_no=args.entry, name=args.name, date_from=args.date_from,
+                                   date_to=args.date_to, days=args.days)
+    for row in rows:
+        called = f"  called by {row['called_by']} at {row['called_at']}" if row["called_by"] else ""
+        print(f"{row['date']} {row['time']}  #{row['entry_no']:<5} {row['name']}  {row['contact_number']}{called}")
+    print(f"{len(rows)} registration(s)")
+    return 0
+
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the registration and call history.")
+    parser.add_argument("--folder", default=HISTORY_FOLDER)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("import", help="import daily workbook copies, the journal and archived calls")
+    visits = commands.add_parser("visits", help="every registration of a phone number")
+    visits.add_argument("contact")
+    visits.add_argument("--days", type=int, default=DEFAULT_DAYS)
+    search = commands.add_parser("search", help="registrations by entry number, name or date range")
+    search.add_argument("--entry", type=int)
+    search.add_argument("--name")
+    search.add_argument("--from", dest="date_from")
+    search.add_argument("--to", dest="date_to")
+    search.add_argument("--days", type=int, default=DEFAULT_DAYS)
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.folder)
+    try:
+        return run_command(store, args)
+    except sqlite3.Error as e:
+        print(f"Could not read {args.folder}/: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import atexit
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+# Every app process keeps its timings in memory and writes them to its own small file in METRICS_FOLDER;
+# the Record Viewer adds all the files up and serves them as Prometheus text on /metrics.
+METRICS_FOLDER = "metrics"
+FLUSH_INTERVAL = 5  # seconds between writes of a process's metrics file (only when something changed)
+STALE_AFTER = 24 * 3600  # files of processes that stopped longer ago than this are removed
+BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+DURATION_METRIC = "ktech_operation_duration_seconds"
+EVENTS_METRIC = "ktech_events_total"
+
+
+class MetricsRecorder:
+    def __init__(self, app, instance=None, folder=METRICS_FOLDER):
+        self.app = app
+        self.instance = instance or socket.gethostname()
+        self.folder = folder
+        self.path = os.path.join(folder, f"{app}-{os.getpid()}.json")
+        self.lock = threading.Lock()
+        self.histograms = {}  # (operation, labels) -> [bucket counts..., sum, count]
+        self.counters = {}    # (event, labels) -> value
+        self.dirty = False
+        self.thread = None
+
+    def observe(self, operation, seconds, **labels):
+        key = (operation, tuple(sorted(labels.items())))
+        with self.lock:
+            series = self.histograms.get(key)
+            if series is None:
+                series = self.histograms[key] = [0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += seconds
+            series[-1] += 1
+            self.dirty = True
+
+    def count(self, event, amount=1, **labels):
+        key = (event, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+            self.dirty = True
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "app": self.app,
+                "instance": self.instance,
+                "pid": os.getpid(),
+                "updated": time.time(),
+                "histograms": [
+                    {"operation": op, "labels": dict(labels), "buckets": series[:-2], "sum": series[-2], "count": series[-1]}
+                    for (op, labels), series in self.histograms.items()
+                ],
+                "counters": [
+                    {"event": event, "labels": dict(labels), "value": value}
+                    for (event, labels), value in self.counters.items()
+                ],
+            }
+
+    def flush(self):
+        if not self.dirty:
+            return
+        self.dirty = False
+        data = self.snapshot()
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # Metrics must never get in the way of the queue; try again on the next flush
+            self.dirty = True
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="MetricsFlush", daemon=True)
+            self.thread.start()
+            atexit.register(self.flush)
+        return self
+
+    def _run(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
+
+
+# --- Process-wide recorder: apps call configure() once, shared modules just call observe()/timed() ---
+_recorder = None
+
+
+def configure(app, instance=None, folder=METRICS_FOLDER):
+    global _recorder
+    _recorder = MetricsRecorder(app, instance, folder).start()
+    return _recorder
+
+
+def recorder():
+    return _recorder
+
+
+def observe(operation, seconds, **labels):
+    if _recorder is not None:
+        _recorder.observe(operation, seconds, **labels)
+
+
+def count(event, amount=1, **labels):
+    if _recorder is not None:
+        _recorder.count(event, amount, **labels)
+
+
+@contextmanager
+def timed(operation, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(operation, time.perf_counter() - start, **labels)
+
+
+# --- Prometheus text exposition of every process's metrics ---
+def collect(folder=METRICS_FOLDER, own=None):
+    # own: this process's recorder, read from memory instead of its (up to FLUSH_INTERVAL old) file
+    snapshots = []
+    own_path = own.path if own is not None else None
+    if os.path.isdir(folder):
+        now = time.time()
+        for name in os.listdir(folder):
+            path = os.path.join(folder, name)
+            if not name.endswith(".json") or path == own_path:
+                continue
+            try:
+                if now - os.path.getmtime(path) > STALE_AFTER:
+                    os.remove(path)
+                    continue
+                with open(path, "r") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    if own is not None:
+        snapshots.append(own.snapshot())
+    return snapshots
+
+
+def _label_text(labels):
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def render_prometheus(snapshots):
+    # Processes of the same app and instance (e.g. after a restart) are added together
+    histograms = {}
+    counters = {}
+    for snap in snapshots:
+        base = (("app", snap.get("app", "")), ("instance", snap.get("instance", "")))
+        for item in snap.get("histograms", []):
+            key = base + (("operation", item["operation"]),) + tuple(sorted(item["labels"].items()))
+            series = histograms.setdefault(key, [0] * len(BUCKETS) + [0.0, 0])
+            for i, value in enumerate(item["buckets"][:len(BUCKETS)]):
+                series[i] += value
+            series[-2] += item["sum"]
+            series[-1] += item["count"]
+        for item in snap.get("counters", []):
+            key = base + (("event", item["event"]),) + tuple(sorted(item["labels"].items()))
+            counters[key] = counters.get(key, 0) + item["value"]
+
+    lines = [f"# HELP {DURATION_METRIC} How long queue system operations take.",
+             f"# TYPE {DURATION_METRIC} histogram"]
+    for key in sorted(histograms):
+        series = histograms[key]
+        cumulative = 0
+        for bound, value in zip(BUCKETS, series):
+            cumulative += value
+            lines.append(f"{DURATION_METRIC}_bucket{_label_text(key + (('le', repr(float(bound))),))} {cumulative}")
+        lines.append(f"{DURATION_METRIC}_bucket{_label_text(key + (('le', '+Inf'),))} {series[-1]}")
+        lines.append(f"{DURATION_METRIC}_sum{_label_text(key)} {series[-2]:.6f}")
+        lines.append(f"{DURATION_METRIC}_count{_label_text(key)} {series[-1]}")
+    lines.append(f"# HELP {EVENTS_METRIC} Number of queue system events.")
+    lines.append(f"# TYPE {EVENTS_METRIC} counter")
+    for key in sorted(counters):
+        lines.append(f"{EVENTS_METRIC}{_label_text(key)} {counters[key]}")
+    return "\n".join(lines) + "\n"
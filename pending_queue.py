@@ -0,0 +1,140 @@
+import heapq
+import itertools
+
+
+# --- Today's waiting candidates, kept in call order with the called tokens in a hash set ---
+# Every operation is O(log n) or better, so calling the 50,000th token costs the same as the first.
+class PendingQueue:
+    def __init__(self):
+        self.entries = {}       # token -> candidate dict, every candidate seen today
+        self.called = set()     # tokens already handed to a room
+        self.positions = {}     # token -> sort key of its live heap entry (pending tokens only)
+        self.original = {}      # token -> sort key it got on arrival, used by requeue and skip
+        self.newest = None      # token added last
+        self.heap = []          # (sort key, token); stale entries are dropped lazily
+        self.sequence = itertools.count(1)
+        self.front = itertools.count(1)
+        self.epoch = None       # QueueStore epoch the called set was last synced from
+        self.seen_calls = 0
+        self.seen_moves = 0
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, token):
+        return token in self.positions
+
+    def _push(self, token, key):
+        self.positions[token] = key
+        heapq.heappush(self.heap, (key, token))
+
+    def add(self, candidate, key=None):
+        # candidate: dict with at least "token"; arrivals are queued in the order they're added.
+        # key: arrival position instead of the queue's own count (RoleScheduler shares one across roles)
+        token = candidate["token"]
+        if token in self.entries:
+            return False
+        self.entries[token] = candidate
+        key = next(self.sequence) if key is None else key
+        self.original[token] = key
+        self.newest = token
+        if token not in self.called:
+            self._push(token, key)
+        return True
+
+    def add_many(self, candidates):
+        for candidate in candidates:
+            self.add(candidate)
+
+    def _discard_stale(self):
+        heap = self.heap
+        while heap:
+            key, token = heap[0]
+            if self.positions.get(token) == key:
+                return token
+            heapq.heappop(heap)
+        return None
+
+    def peek(self):
+        # Next candidate to call, without removing it
+        token = self._discard_stale()
+        return None if token is None else self.entries[token]
+
+    def first(self, count):
+        # The next `count` candidates in call order; walks only the top of the heap
+        result = []
+        seen = set()
+        heap = self.heap
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier and len(result) < count:
+            (key, token), i = heapq.heappop(frontier)
+            if self.positions.get(token) == key and token not in seen:
+                seen.add(token)
+                result.append(self.entries[token])
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return result
+
+    def next_for(self, counter, now=None):
+        # A plain queue serves every room alike; RoleScheduler routes by role instead
+        return self.peek()
+
+    def mark_called(self, token):
+        self.called.add(token)
+        # The heap entry stays behind and is skipped when it reaches the top
+        self.positions.pop(token, None)
+
+    def pop_next(self):
+        candidate = self.peek()
+        if candidate is not None:
+            self.mark_called(candidate["token"])
+        return candidate
+
+    def skip(self, token, after=None):
+        # Candidate not present yet: moves behind everyone who arrived up to token `after`
+        # (default: everyone currently waiting), ahead of later arrivals
+        return self.place(token, self.original.get(self.newest if after is None else after))
+
+    def place(self, token, arrival_key):
+        # Same position in every room that has seen the same arrivals, however late it catches up
+        if token not in self.positions or arrival_key is None:
+            return False
+        self._push(token, arrival_key + 0.5)
+        return True
+
+    # skip and requeue only change this queue; rooms share them through QueueStore.skip/requeue
+    def requeue(self, token, front=False):
+        # Called candidate back in the queue: in their original place, or ahead of everyone
+        if token not in self.entries or token in self.positions:
+            return False
+        self.called.discard(token)
+        self._push(token, -next(self.front) if front else self.original[token])
+        return True
+
+    def move(self, token, move, after=None):
+        # A QueueStore move made by any room: "front" (requeued ahead of everyone) or "back" (skipped)
+        if token not in self.positions:
+            return False
+        if move == "front":
+            self._push(token, -next(self.front))
+            return True
+        return self.skip(token, after)
+
+    def apply_calls(self, epoch, called_log, moves=()):
+        # Catch up with calls and moves made by any room; both only grow until the epoch changes
+        if epoch != self.epoch:
+            self.epoch = epoch
+            self.seen_calls = 0
+            self.seen_moves = 0
+            for token in list(self.called):
+                self.requeue(token)
+        for token in called_log[self.seen_calls:]:
+            self.mark_called(token)
+        self.seen_calls = len(called_log)
+        for token, move, after in moves[self.seen_moves:]:
+            self.move(token, move, after)
+        self.seen_moves = len(moves)
+
+    def clear(self):
+        self.__init__()
@@ -0,0 +1,363 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+import metrics
+from app_files import (JOURNAL_FILE, EXCEL_FILE, TICKET_FOLDER, STATE_DB, STATE_FILE, COUNTER_DB,
+                       HISTORY_FOLDER, DATE_TRACK_FILE, today_str)
+from registration_journal import RegistrationJournal, JournalReader, ExcelExporter
+from ticket_counter import TicketCounter
+from queue_store import QueueStore
+from routing import RoleScheduler, load_routing_config
+from bulk_import import build_records
+from history_store import HistoryStore
+
+# The queue without any windows: the Tk apps are thin clients of these classes,
+# and `python queue_engine.py` runs the same operations from a terminal or a headless server.
+
+
+# --- Registration: entry numbers, the journal and the workbook export behind a reception desk ---
+class RegistrationDesk:
+    def __init__(self, desk="", block_size=0, journal_file=JOURNAL_FILE, excel_file=EXCEL_FILE,
+                 ticket_folder=TICKET_FOLDER, counter_db=COUNTER_DB, date_track_file=DATE_TRACK_FILE,
+                 history_folder=HISTORY_FOLDER, routing=None):
+        self.excel_file = excel_file
+        self.routing = routing or load_routing_config()
+        self.ticket_folder = ticket_folder
+        self.date_track_file = date_track_file
+        # Registrations go to an append-only journal; the workbook is exported from it in the background
+        self.journal = RegistrationJournal(journal_file)
+        self.journal.import_excel(excel_file)
+        self.exporter = ExcelExporter(self.journal, excel_file, ticket_folder)
+        # Entry numbers come from a persisted counter shared by every desk, not from counting rows
+        self.counter = TicketCounter(counter_db, desk, block_size)
+        # The journal is emptied every morning; the history store keeps every registration for good
+        self.history = HistoryStore(history_folder)
+        self.today = today_str()
+        self.ticket_number = self.start_day()
+        if not os.path.exists(excel_file):
+            self.exporter.request_export()
+
+    def start_day(self):
+        # The first start on a new day empties the journal; returns the last entry number handed out
+        last_date = None
+        if os.path.exists(self.date_track_file):
+            with open(self.date_track_file, "r") as f:
+                last_date = f.read().strip()
+        if last_date != self.today:
+            os.makedirs(os.path.dirname(self.date_track_file) or ".", exist_ok=True)
+            with open(self.date_track_file, "w") as f:
+                f.write(self.today)
+        if last_date is not None and last_date != self.today:
+            self.reset_journal()
+            # The counter is kept per day, so a new day starts from 0 on its own
+            return self.counter.current()
+        return self.last_ticket_number()
+
+    def count_journal_entries(self):
+        return sum(1 for record in self.journal.read_all() if record.get("date") == self.today)
+
+    def last_ticket_number(self):
+        # The journal is only scanned the first time a day is seen without a counter (upgrades)
+        with metrics.timed("load_ticket_number"):
+            self.counter.seed(self.count_journal_entries)
+            return self.counter.current()
+
+    def ticket_path(self, record, file_time):
+        folder_name = os.path.join(self.ticket_folder, f"{record['date']} - Entries")
+        os.makedirs(folder_name, exist_ok=True)
+        safe_name = record["name"].replace(" ", "_")
+        return os.path.join(folder_name, f"Entry_{record['entry_no']}_{safe_name}_{file_time}.pdf")
+
+    def register(self, name, contact_number, role=None, now=None):
+        # Returns the journaled record and the path its entry pass should be written to;
+        # raises ValueError for a role that config/routing.json doesn't define
+        role = self.routing.check_role(role)
+        now = now or datetime.now()
+        self.ticket_number = self.counter.next_number()
+        record = {
+            "date": now.strftime("%Y-%m-%d"),
+            "day": now.strftime("%A"),
+            "time": now.strftime("%H:%M:%S"),
+            "name": name,
+            "contact_number": contact_number,
+            "entry_no": self.ticket_number,
+            "role": role
+        }
+        self.journal.append(record)
+        self.add_history([record])
+        # Rebuilds candidate_list.xlsx and the daily copy off the caller's thread
+        self.exporter.request_export()
+        metrics.count("tickets_generated")
+        return record, self.ticket_path(record, now.strftime("%H-%M-%S"))
+
+    def register_many(self, candidates):
+        # candidates: (row, name, contact, role) tuples from bulk_import.read_candidates.
+        # All entry numbers are reserved in one counter transaction and journaled in one write.
+        first = self.counter.take(len(candidates))
+        records, jobs = build_records(candidates, first, ticket_folder=self.ticket_folder)
+        with metrics.timed("bulk_register"):
+            self.journal.append_many(records)
+        self.add_history(records)
+        self.ticket_number = first + len(candidates) - 1
+        self.exporter.request_export()
+        metrics.count("tickets_generated", len(records))
+        return records, jobs
+
+    def add_history(self, records):
+        # A failed history write never stops a registration; `python history_store.py import` fills the gap
+        try:
+            self.history.add_registrations(records)
+        except sqlite3.Error:
+            metrics.count("history_write_failed")
+
+    def reset_journal(self):
+        self.journal.reset()
+        self.exporter.request_export()
+
+    def reset(self):
+        # Entry numbers start over at 1 and today's registrations are cleared
+        self.counter.reset()
+        self.ticket_number = 0
+        self.reset_journal()
+
+    def close(self):
+        # Waits for the last workbook export
+        self.exporter.close()
+        self.counter.close()
+        self.history.close()
+
+
+# --- Today's candidates from the journal, queued per role (config/routing.json) ---
+class CandidateQueue:
+    def __init__(self, journal_file=JOURNAL_FILE, routing=None):
+        self.journal_file = journal_file
+        self.reader = JournalReader(journal_file)
+        self.routing = routing or load_routing_config()
+        self.pending = RoleScheduler(self.routing)
+        self.tokens_day = None
+
+    def refresh(self):
+        # False when the journal doesn't exist (nobody registered yet)
+        if not self.reader.exists():
+            return False
+
+        today = today_str()
+        if today != self.tokens_day:
+            self.tokens_day = today
+            self.pending.clear()
+            self.reader.rewind()
+
+        # Only rows appended since the last poll are parsed; unchanged file is skipped entirely
+        start = time.perf_counter()
+        reloaded, records = self.reader.poll()
+        if reloaded:
+            self.pending.clear()
+        if not records:
+            return True
+
+        for record in records:
+            if record.get("date") == today:
+                self.pending.add({
+                    "token": record.get("entry_no"),
+                    "name": record.get("name"),
+                    "date": record.get("date"),
+                    "time": record.get("time"),
+                    "role": record.get("role")
+                })
+        metrics.observe("load_tokens", time.perf_counter() - start)
+        return True
+
+
+# --- Calling: rooms sharing one queue database; a token is handed to exactly one room ---
+class QueueEngine:
+    def __init__(self, candidates=None, store=None, journal_file=JOURNAL_FILE, state_db=STATE_DB, state_file=STATE_FILE):
+        self.candidates = candidates or CandidateQueue(journal_file)
+        self.store = store or QueueStore(state_db, state_file)
+
+    def call_next(self, counter):
+        # Picks up registrations made since the last call (a cheap no-op if there are none)
+        self.candidates.refresh()
+        with metrics.timed("call_next", room=counter):
+            claimed = self.store.claim_next(counter, self.candidates.pending)
+        metrics.count("tokens_called" if claimed else "queue_empty", room=counter)
+        return claimed
+
+    def requeue(self, token, front=False):
+        # Candidate missed their call: the call is withdrawn and every room can call them again
+        self.candidates.refresh()
+        return self.store.requeue(token, self.candidates.pending, front)
+
+    def skip(self, token):
+        self.candidates.refresh()
+        return self.store.skip(token, self.candidates.pending)
+
+    def waiting(self, count=None):
+        # Today's waiting candidates in the order the rooms will call them (RoleScheduler.first)
+        self.candidates.refresh()
+        self.store.sync_pending(self.candidates.pending)
+        return self.candidates.pending.first(len(self.candidates.pending) if count is None else count)
+
+    def board(self):
+        # Latest call per room, most recent first, as on the Central Display
+        return board_rows({"called_tokens": self.store.latest_per_counter()})
+
+    def reset(self):
+        self.store.reset()
+
+    def close(self):
+        self.store.close()
+
+
+# --- Central Display: queue_state.json turned into board rows ---
+def read_state_file(path, stat_key=None):
+    # Returns (stat key, state); state is None when the file is unchanged since stat_key
+    try:
+        st = os.stat(path)
+        new_key = (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        new_key = "missing"
+    if new_key == stat_key:
+        return stat_key, None
+    if new_key == "missing":
+        return new_key, {}
+    try:
+        with open(path, "r") as f:
+            return new_key, json.load(f)
+    except (OSError, ValueError):
+        # Caught mid-write; try again on the next refresh
+        return stat_key, None
+
+
+def board_rows(state):
+    latest_per_counter = {}
+    for item in state.get("called_tokens", []):
+        latest_per_counter[item["counter"]] = item
+    return sorted(latest_per_counter.values(), key=lambda item: item.get("timestamp", ""), reverse=True)
+
+
+def upcoming_tokens(state):
+    # Yesterday's estimate stays in the file until the first call of the day
+    estimate = state.get("estimate") or {}
+    if not str(estimate.get("updated")).startswith(today_str()):
+        return estimate, []
+    return estimate, estimate.get("upcoming", [])
+
+
+# --- Command line ---
+def cmd_register(args):
+    desk = RegistrationDesk(args.desk)
+    try:
+        record, pdf_path = desk.register(args.name, args.contact, args.role)
+    except ValueError as e:
+        desk.close()
+        print(e, file=sys.stderr)
+        return 2
+    if args.pdf:
+        from ticket_renderer import create_ticket_pdf, register_pdf_font
+        ticket = {key: record[key] for key in ("name", "contact_number", "entry_no", "date", "day", "time", "role")}
+        create_ticket_pdf(pdf_path, register_pdf_font(), **ticket)
+    desk.close()
+    print(f"Entry No {record['entry_no']}: {record['name']}" + (f" ({pdf_path})" if args.pdf else ""))
+    return 0
+
+
+def cmd_call(args):
+    engine = QueueEngine()
+    claimed = engine.call_next(args.room)
+    engine.close()
+    if claimed is None:
+        print("No more tokens to call.")
+        return 1
+    print(f"{args.room}: Token {claimed['token']} - {claimed['name']}")
+    return 0
+
+
+def cmd_requeue(args):
+    engine = QueueEngine()
+    done = engine.requeue(args.token, args.front) if args.command == "requeue" else engine.skip(args.token)
+    engine.close()
+    if not done:
+        state = "called" if args.command == "requeue" else "waiting"
+        print(f"Token {args.token} is not {state} today.")
+        return 1
+    print(f"Token {args.token} " + ("back in the queue." if args.command == "requeue" else "moved behind everyone waiting."))
+    return 0
+
+
+def cmd_list(args):
+    engine = QueueEngine()
+    waiting = engine.waiting(args.limit)
+    board = engine.board()
+    engine.close()
+    if args.json:
+        print(json.dumps({"waiting": waiting, "called": board}, indent=2))
+        return 0
+    print(f"Waiting ({len(waiting)}):")
+    for candidate in waiting:
+        role = f"  [{candidate['role']}]" if candidate.get("role") else ""
+        print(f"  {candidate['token']:>5}  {candidate['name']}{role}")
+    print("Now called:")
+    for item in board:
+        print(f"  {item['counter']:<12} {item['token']:>5}  {item['name']}  ({item['time']})")
+    return 0
+
+
+def cmd_reset(args):
+    if args.what in ("queue", "all"):
+        engine = QueueEngine()
+        engine.reset()
+        engine.close()
+        print("Queue reset: no tokens called today.")
+    if args.what in ("entries", "all"):
+        desk = RegistrationDesk(args.desk)
+        desk.reset()
+        desk.close()
+        print("Entry numbers reset and today's registrations cleared.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the interview queue without the windows.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    register = commands.add_parser("register", help="register a candidate and print their entry number")
+    register.add_argument("name")
+    register.add_argument("contact")
+    register.add_argument("--role", help="role from config/routing.json")
+    register.add_argument("--desk", default="", help="desk name (for desks with their own number blocks)")
+    register.add_argument("--pdf", action="store_true", help="also write the entry pass PDF")
+    register.set_defaults(run=cmd_register)
+
+    call = commands.add_parser("call", help="call the next candidate to a room")
+    call.add_argument("room", help='e.g. "Room 1"')
+    call.set_defaults(run=cmd_call)
+
+    requeue = commands.add_parser("requeue", help="put a called candidate back in the queue for every room")
+    requeue.add_argument("token", type=int)
+    requeue.add_argument("--front", action="store_true", help="ahead of everyone instead of their original place")
+    requeue.set_defaults(run=cmd_requeue)
+
+    skip = commands.add_parser("skip", help="move a waiting candidate who isn't here yet behind everyone waiting")
+    skip.add_argument("token", type=int)
+    skip.set_defaults(run=cmd_requeue)
+
+    listing = commands.add_parser("list", help="show the waiting candidates and the latest call per room")
+    listing.add_argument("--limit", type=int, help="show only the next N waiting candidates")
+    listing.add_argument("--json", action="store_true")
+    listing.set_defaults(run=cmd_list)
+
+    reset = commands.add_parser("reset", help="start the queue and/or the entry numbers over")
+    reset.add_argument("what", nargs="?", choices=["queue", "entries", "all"], default="queue")
+    reset.add_argument("--desk", default="")
+    reset.set_defaults(run=cmd_reset)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
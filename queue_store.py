@@ -0,0 +1,393 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from app_files import STATE_DB, STATE_FILE, ARCHIVE_FOLDER, HISTORY_FOLDER, today_str
+from change_notify import notify, TOPIC_QUEUE
+from wait_estimator import WaitEstimator, SAMPLE_WINDOW, UPCOMING
+from history_store import HistoryStore
+from sqlite_mode import set_journal_mode
+
+SNAPSHOT_EVERY = 200  # calls between compact snapshots of the day's called tokens
+ARCHIVE_BATCH = 500  # rows moved per transaction, so rooms calling meanwhile only wait milliseconds
+
+
+def write_json_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    # Readers (Central Display) may hold the file open for a moment on Windows
+    for attempt in range(5):
+        try:
+            os.replace(tmp_path, path)
+            return True
+        except PermissionError:
+            time.sleep(0.05)
+    return False
+
+
+# --- SQLite (WAL) backed store for called tokens, shared by all rooms ---
+class QueueStore:
+    def __init__(self, db_path=STATE_DB, state_file=STATE_FILE):
+        self.db_path = db_path
+        self.state_file = state_file
+        is_new = not os.path.exists(db_path)
+        self.conn = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        set_journal_mode(self.conn, db_path)
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS called_tokens (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                day TEXT NOT NULL,
+                token INTEGER NOT NULL,
+                name TEXT,
+                counter TEXT NOT NULL,
+                time TEXT,
+                timestamp TEXT NOT NULL,
+                UNIQUE (day, token)
+            )
+        """)
+        # Incremental sync reads "today's calls after id N"; without this it sorts the whole day each time
+        self.conn.execute("CREATE INDEX IF NOT EXISTS called_tokens_day_id ON called_tokens (day, id)")
+        # Latest call per room, kept alongside so the display mirror costs the same at any queue length
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS latest_calls (
+                counter TEXT PRIMARY KEY,
+                day TEXT NOT NULL,
+                token INTEGER NOT NULL,
+                name TEXT,
+                time TEXT,
+                timestamp TEXT NOT NULL
+            )
+        """)
+        # called_tokens is the append-only call log; a snapshot lets a room that starts late in the day
+        # load one compact row plus the calls made after it instead of replaying the whole day
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                day TEXT NOT NULL,
+                generation INTEGER NOT NULL,
+                last_id INTEGER NOT NULL,
+                tokens TEXT NOT NULL,
+                PRIMARY KEY (day, generation)
+            )
+        """)
+        # Requeues to the front and skips made by any room, replayed by every room's PendingQueue.
+        # A skip keeps the newest token at the time (after_token), so every room puts it in the same place.
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS queue_moves (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                day TEXT NOT NULL,
+                token INTEGER NOT NULL,
+                move TEXT NOT NULL,
+                after_token INTEGER
+            )
+        """)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
+
+        # Local cache of today's called tokens, caught up incrementally by row id
+        self.day = None
+        self.generation = None
+        self.called = set()
+        self.called_log = []    # same tokens in call order, consumed incrementally by PendingQueue
+        self.moves = []         # (token, "front" or "back", after_token) in the order they were made
+        self.epoch = 0          # bumped whenever the cache starts over (new day, reset or requeue)
+        self.last_id = 0
+        self.moves_id = 0
+        self.snapshot_id = 0
+        self.estimator = WaitEstimator()
+
+        if is_new:
+            self._import_state_file()
+        if is_new or not os.path.exists(self.state_file):
+            self.write_state_file()
+
+    def _import_state_file(self):
+        # Carry over calls already made today by the JSON-only version
+        if not os.path.exists(self.state_file):
+            return
+        modified = datetime.fromtimestamp(os.path.getmtime(self.state_file)).strftime("%Y-%m-%d")
+        if modified != today_str():
+            return
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+        except ValueError:
+            return
+        now = datetime.now().isoformat(timespec="seconds")
+        with self.transaction():
+            for item in state.get("called_tokens", []):
+                self._insert_call(modified, item["token"], item.get("name"), item.get("counter", ""),
+                                  item.get("time"), item.get("timestamp", now))
+
+    @contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two rooms can never claim the same token
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _insert_call(self, day, token, name, counter, time_str, timestamp):
+        self.conn.execute(
+            "INSERT INTO called_tokens (day, token, name, counter, time, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+            (day, token, name, counter, time_str, timestamp)
+        )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO latest_calls (counter, day, token, name, time, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (counter, day, token, name, time_str, timestamp)
+        )
+
+    def _sync(self):
+        day = today_str()
+        generation = self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+        if day != self.day or generation != self.generation:
+            # New day, or another process reset the queue or requeued a candidate
+            self.day = day
+            self.generation = generation
+            self.called = set()
+            self.called_log = []
+            self.moves = []
+            self.epoch += 1
+            self.last_id = 0
+            self.moves_id = 0
+            self.estimator = WaitEstimator()
+            self._load_snapshot()
+        rows = self.conn.execute(
+            "SELECT id, token, counter, timestamp FROM called_tokens WHERE day = ? AND id > ? ORDER BY id",
+            (day, self.last_id)
+        ).fetchall()
+        for row_id, token, counter, timestamp in rows:
+            self.called.add(token)
+            self.called_log.append(token)
+            self.estimator.observe_call(counter, token, timestamp)
+            self.last_id = row_id
+        for row_id, token, move, after in self.conn.execute(
+                "SELECT id, token, move, after_token FROM queue_moves WHERE day = ? AND id > ? ORDER BY id",
+                (day, self.moves_id)):
+            self.moves.append((token, move, after))
+            self.moves_id = row_id
+
+    def _load_snapshot(self):
+        row = self.conn.execute(
+            "SELECT last_id, tokens FROM snapshots WHERE day = ? AND generation = ?",
+            (self.day, self.generation)
+        ).fetchone()
+        if row is None:
+            self.snapshot_id = 0
+            return
+        self.last_id = self.snapshot_id = row[0]
+        self.called_log = json.loads(row[1])
+        self.called = set(self.called_log)
+        # Room timings only need the latest calls, not the whole day
+        recent = self.conn.execute(
+            "SELECT token, counter, timestamp FROM called_tokens WHERE day = ? AND id <= ? ORDER BY id DESC LIMIT ?",
+            (self.day, self.last_id, SAMPLE_WINDOW * 4)
+        ).fetchall()
+        for token in self.called_log:
+            self.estimator.called.add(token)
+        for token, counter, timestamp in reversed(recent):
+            self.estimator.observe_call(counter, token, timestamp)
+
+    def _write_snapshot(self):
+        # Inside the caller's transaction; costs one row write every SNAPSHOT_EVERY calls
+        self.conn.execute(
+            "INSERT OR REPLACE INTO snapshots (day, generation, last_id, tokens) VALUES (?, ?, ?, ?)",
+            (self.day, self.generation, self.last_id, json.dumps(self.called_log, separators=(",", ":")))
+        )
+        self.snapshot_id = self.last_id
+
+    def called_tokens(self):
+        self._sync()
+        return set(self.called)
+
+    def sync_pending(self, pending):
+        # Catches a PendingQueue or RoleScheduler up with every room's calls without calling anyone
+        self._sync()
+        pending.apply_calls(self.epoch, self.called_log, self.moves)
+
+    def claim_next(self, counter, pending):
+        # pending: the caller's PendingQueue or RoleScheduler of today's candidates
+        with self.transaction():
+            self._sync()
+            pending.apply_calls(self.epoch, self.called_log, self.moves)
+            claimed = pending.next_for(counter)
+            if claimed is not None:
+                self._insert_call(self.day, claimed["token"], claimed["name"], counter, claimed["time"],
+                                  datetime.now().isoformat(timespec="milliseconds"))
+                self._sync()
+                pending.apply_calls(self.epoch, self.called_log, self.moves)
+                if self.last_id - self.snapshot_id >= SNAPSHOT_EVERY:
+                    self._write_snapshot()
+                # Written under the lock so concurrent rooms can't overwrite each other's mirror
+                self.write_state_file(pending.first(UPCOMING))
+        if claimed is not None:
+            notify(TOPIC_QUEUE)
+        return claimed
+
+    def requeue(self, token, pending, front=False):
+        # A called candidate back in the queue for every room, in their original place or ahead of
+        # everyone. The call row goes in the same transaction, so the token can be claimed again;
+        # called_log only grows, so the generation is bumped and each room rebuilds today's queue.
+        day = today_str()
+        with self.transaction():
+            removed = self.conn.execute("DELETE FROM called_tokens WHERE day = ? AND token = ?", (day, token)).rowcount
+            if removed:
+                self.conn.execute("DELETE FROM latest_calls WHERE day = ? AND token = ?", (day, token))
+                self.conn.execute("DELETE FROM queue_moves WHERE day = ? AND token = ?", (day, token))
+                if front:
+                    self.conn.execute("INSERT INTO queue_moves (day, token, move) VALUES (?, ?, 'front')", (day, token))
+                self.conn.execute("DELETE FROM snapshots WHERE day = ?", (day,))
+                self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+                self._sync()
+                pending.apply_calls(self.epoch, self.called_log, self.moves)
+                self.write_state_file(pending.first(UPCOMING))
+        if removed:
+            notify(TOPIC_QUEUE)
+        return bool(removed)
+
+    def skip(self, token, pending):
+        # A waiting candidate who isn't here yet moves behind everyone currently waiting, in every room
+        with self.transaction():
+            self._sync()
+            pending.apply_calls(self.epoch, self.called_log, self.moves)
+            if token not in pending:
+                return False
+            self.conn.execute("INSERT INTO queue_moves (day, token, move, after_token) VALUES (?, ?, 'back', ?)",
+                              (self.day, token, pending.newest))
+            self._sync()
+            pending.apply_calls(self.epoch, self.called_log, self.moves)
+            self.write_state_file(pending.first(UPCOMING))
+        notify(TOPIC_QUEUE)
+        return True
+
+    def latest_per_counter(self):
+        rows = self.conn.execute(
+            "SELECT token, name, counter, time, timestamp FROM latest_calls WHERE day = ? ORDER BY timestamp",
+            (today_str(),)
+        ).fetchall()
+        return [
+            {"token": token, "name": name, "counter": counter, "time": t, "timestamp": ts}
+            for token, name, counter, t, ts in rows
+        ]
+
+    def estimate(self, upcoming=()):
+        self._sync()
+        return self.estimator.summary(upcoming)
+
+    def write_state_file(self, upcoming=()):
+        # queue_state.json is kept as a small mirror (latest call per room and wait estimates)
+        # for the Central Display and the POS
+        return write_json_atomic(self.state_file, {"queue": [], "called_tokens": self.latest_per_counter(),
+                                                   "estimate": self.estimate(upcoming)})
+
+    def reset(self):
+        with self.transaction():
+            self.conn.execute("DELETE FROM called_tokens WHERE day = ?", (today_str(),))
+            self.conn.execute("DELETE FROM snapshots WHERE day = ?", (today_str(),))
+            self.conn.execute("DELETE FROM queue_moves WHERE day = ?", (today_str(),))
+            self.conn.execute("DELETE FROM latest_calls")
+            self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+            self._sync()
+            self.write_state_file()
+        notify(TOPIC_QUEUE)
+
+    def compact_in_background(self, archive_folder=ARCHIVE_FOLDER):
+        # Moves earlier days out of the live database; runs on its own connection
+        thread = threading.Thread(target=archive_queue, args=(self.db_path, archive_folder),
+                                  name="QueueCompaction", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        self.conn.close()
+
+
+# --- Archive: finished days move from the live database to Archive/<day>/queue_events.jsonl ---
+def archive_queue(db_path=STATE_DB, archive_folder=ARCHIVE_FOLDER, include_today=False, history_folder=HISTORY_FOLDER):
+    # Returns {day: calls archived}. Rows are copied and fsynced before they are deleted, in small
+    # batches, so a crash can at worst repeat a few lines in the archive and never loses a call.
+    # The same rows go into the history store, where they can be queried across days.
+    if not os.path.exists(db_path):
+        return {}
+    history = HistoryStore(history_folder)
+    conn = sqlite3.connect(db_path, timeout=10, isolation_level=None)
+    today = today_str()
+    condition = "day <= ?" if include_today else "day < ?"
+    archived = {}
+    try:
+        days = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT day FROM called_tokens WHERE {condition} ORDER BY day", (today,))]
+        for day in days:
+            folder = os.path.join(archive_folder, day)
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, "queue_events.jsonl"), "a", encoding="utf-8") as f:
+                while True:
+                    rows = conn.execute(
+                        "SELECT id, token, name, counter, time, timestamp FROM called_tokens "
+                        "WHERE day = ? ORDER BY id LIMIT ?", (day, ARCHIVE_BATCH)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    calls = [{"token": token, "name": name, "counter": counter, "time": time_str, "timestamp": timestamp}
+                             for _, token, name, counter, time_str, timestamp in rows]
+                    for call in calls:
+                        f.write(json.dumps(call, ensure_ascii=False) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                    try:
+                        history.add_calls(day, calls)
+                    except sqlite3.Error:
+                        # Still in the archive file; `python history_store.py import` picks it up
+                        pass
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute("DELETE FROM called_tokens WHERE day = ? AND id <= ?", (day, rows[-1][0]))
+                    conn.execute("COMMIT")
+                    archived[day] = archived.get(day, 0) + len(rows)
+
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(f"DELETE FROM snapshots WHERE {condition}", (today,))
+        conn.execute(f"DELETE FROM latest_calls WHERE {condition}", (today,))
+        conn.execute(f"DELETE FROM queue_moves WHERE {condition}", (today,))
+        if include_today:
+            # Rooms that are still open see the new generation and start the day over
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+        history.close()
+    return archived
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive called tokens out of the live queue database.")
+    parser.add_argument("--include-today", action="store_true",
+                        help="also archive today's calls and start the queue over (end of day)")
+    parser.add_argument("--db", default=STATE_DB)
+    parser.add_argument("--state-file", default=STATE_FILE)
+    parser.add_argument("--archive", default=ARCHIVE_FOLDER)
+    args = parser.parse_args(argv)
+
+    archived = archive_queue(args.db, args.archive, args.include_today)
+    store = QueueStore(args.db, args.state_file)
+    store.write_state_file()
+    store.close()
+    notify(TOPIC_QUEUE)
+    if not archived:
+        print("Nothing to archive.")
+    for day, count in archived.items():
+        print(f"{day}: {count} calls archived to {os.path.join(args.archive, day, 'queue_events.jsonl')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
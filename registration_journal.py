@@ -0,0 +1,351 @@
+import json
+import os
+import shutil
+import threading
+import time
+from app_files import JOURNAL_FILE, EXCEL_FILE, TICKET_FOLDER
+from change_notify import notify, TOPIC_JOURNAL, TOPIC_WORKBOOK
+from routing import load_routing_config
+import metrics
+
+SNAPSHOT_INTERVAL = 60  # seconds between daily copies at most
+SNAPSHOT_EVERY = 25  # ...unless this many new tickets are waiting
+SNAPSHOT_RETRY = 30  # seconds before a failed daily copy (open in Excel, bad folder) is tried again
+HEADERS = ["Date", "Day", "Time", "Candidate Name", "Contact Number", "Entry No", "Role"]
+RECORD_KEYS = ["date", "day", "time", "name", "contact_number", "entry_no", "role"]
+
+
+def record_to_row(record, keys=RECORD_KEYS):
+    return [record.get(key) for key in keys]
+
+
+def workbook_has_role(records):
+    # The Role column is only added for drives with several roles (or records that carry one),
+    # so the workbook keeps its usual six columns everywhere else
+    if any(record.get("role") for record in records):
+        return True
+    try:
+        return len(load_routing_config().role_names()) > 1
+    except (OSError, ValueError):
+        return False
+
+
+def row_to_record(row):
+    return dict(zip(RECORD_KEYS, row))
+
+
+# --- Append-only registration journal (one JSON object per line) ---
+class RegistrationJournal:
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+        notify(TOPIC_JOURNAL)
+
+    def append_many(self, records):
+        # A whole batch goes out in one write, so other readers never see half of it
+        data = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        notify(TOPIC_JOURNAL)
+
+    def read_all(self):
+        records = []
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A half-written last line (power cut) is skipped, not fatal
+                    continue
+        return records
+
+    def reset(self):
+        with self.lock:
+            with open(self.path, "w", encoding="utf-8"):
+                pass
+        notify(TOPIC_JOURNAL)
+
+    def import_excel(self, excel_path=EXCEL_FILE):
+        # One-time migration: seed the journal from an existing workbook
+        if self.exists() or not os.path.exists(excel_path):
+            return 0
+        from openpyxl import load_workbook
+        wb = load_workbook(excel_path, read_only=True)
+        ws = wb.active
+        count = 0
+        with self.lock:
+            with open(self.path, "w", encoding="utf-8") as f:
+                for row in ws.iter_rows(min_row=2, values_only=True):
+                    if not row or row[0] is None:
+                        continue
+                    f.write(json.dumps(row_to_record(row[:len(RECORD_KEYS)]), ensure_ascii=False, default=str) + "\n")
+                    count += 1
+        wb.close()
+        return count
+
+
+# --- Incremental reader: parses only the lines appended since the last poll ---
+class JournalReader:
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self.rewind()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def rewind(self):
+        self.offset = 0
+        self.stat_key = None
+        self.head = b""
+
+    def _was_truncated(self, f, size):
+        if size < self.offset:
+            return True
+        # Reset and refilled past our offset between two polls: the first line no longer matches
+        if self.head:
+            f.seek(0)
+            return f.read(len(self.head)) != self.head
+        return False
+
+    def poll(self):
+        # Returns (reloaded, new_records); reloaded means earlier records are gone and the caller starts over
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            reloaded = self.offset > 0
+            self.rewind()
+            return reloaded, []
+        stat_key = (st.st_mtime_ns, st.st_size)
+        if stat_key == self.stat_key:
+            return False, []
+
+        records = []
+        with open(self.path, "rb") as f:
+            reloaded = self._was_truncated(f, st.st_size)
+            if reloaded:
+                self.rewind()
+            f.seek(self.offset)
+            data = f.read()
+        self.stat_key = stat_key
+
+        # Leave a half-written last line for the next poll
+        end = data.rfind(b"\n")
+        if end < 0:
+            return reloaded, records
+        chunk = data[:end + 1]
+        if self.offset == 0:
+            self.head = chunk[:chunk.find(b"\n") + 1]
+        self.offset += len(chunk)
+        for line in chunk.decode("utf-8").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return reloaded, records
+
+
+def write_excel(records, excel_path=EXCEL_FILE, with_role=None):
+    # openpyxl is imported on first use: it is the slowest import of the apps and most starts never need it
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, PatternFill
+
+    if with_role is None:
+        with_role = workbook_has_role(records)
+    headers = HEADERS if with_role else HEADERS[:-1]
+    keys = RECORD_KEYS if with_role else RECORD_KEYS[:-1]
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    for col, header in enumerate(headers, start=1):
+        ws.column_dimensions[chr(64 + col)].width = max(len(header) + 5, 15)
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal='center')
+        cell.fill = PatternFill(start_color="003F5C", end_color="003F5C", fill_type="solid")
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    center = Alignment(horizontal='center')
+    for record in records:
+        row = []
+        for value in record_to_row(record, keys):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.alignment = center
+            row.append(cell)
+        ws.append(row)
+
+    # Write next to the target and swap in, so readers never see a partial workbook. The temp name
+    # is per process: every desk's exporter writes the same workbook.
+    tmp_path = f"{excel_path}.{os.getpid()}.tmp"
+    try:
+        wb.save(tmp_path)
+        os.replace(tmp_path, excel_path)
+    except OSError:
+        # Usually the workbook is open in Excel; don't leave a stray temp file behind
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# --- Debounced daily copy under Tickets/<date> - Entries ---
+class SnapshotScheduler:
+    def __init__(self, ticket_folder=TICKET_FOLDER, interval=SNAPSHOT_INTERVAL, every=SNAPSHOT_EVERY):
+        self.ticket_folder = ticket_folder
+        self.interval = interval
+        self.every = every
+        self.date = None
+        self.rows = 0
+        self.snapshot_rows = 0
+        self.pending = False
+        self.last_written = None
+        self.last_failed = None
+
+    def mark(self, date, rows):
+        # Called after each export with the day and row count now in the workbook
+        if date != self.date:
+            self.date = date
+            self.snapshot_rows = 0
+        self.rows = rows
+        self.pending = date is not None and rows != self.snapshot_rows
+
+    def seconds_until_due(self):
+        if not self.pending:
+            return None
+        if self.last_failed is not None:
+            return max(0.0, SNAPSHOT_RETRY - (time.monotonic() - self.last_failed))
+        if self.last_written is None or self.rows - self.snapshot_rows >= self.every:
+            return 0
+        return max(0.0, self.interval - (time.monotonic() - self.last_written))
+
+    def due(self):
+        return self.seconds_until_due() == 0
+
+    def write(self, excel_path):
+        folder_name = os.path.join(self.ticket_folder, f"{self.date} - Entries")
+        os.makedirs(folder_name, exist_ok=True)
+        daily_excel_path = os.path.join(folder_name, f"candidate_list_{self.date}.xlsx")
+        # Copy next to the target and rename, so nobody opens a half-written copy; per process, like the workbook
+        tmp_path = f"{daily_excel_path}.{os.getpid()}.tmp"
+        try:
+            shutil.copyfile(excel_path, tmp_path)
+            os.replace(tmp_path, daily_excel_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.snapshot_rows = self.rows
+        self.pending = False
+        self.last_written = time.monotonic()
+        self.last_failed = None
+
+    def failed(self):
+        # Backs off instead of reporting the copy due again straight away
+        self.last_failed = time.monotonic()
+
+
+# --- Background Excel export built from the journal ---
+class ExcelExporter:
+    def __init__(self, journal, excel_path=EXCEL_FILE, ticket_folder=TICKET_FOLDER,
+                 snapshot_interval=SNAPSHOT_INTERVAL, snapshot_every=SNAPSHOT_EVERY):
+        self.journal = journal
+        self.excel_path = excel_path
+        self.ticket_folder = ticket_folder
+        self.snapshot = SnapshotScheduler(ticket_folder, snapshot_interval, snapshot_every)
+        self.cond = threading.Condition()
+        self.requested = 0
+        self.exported = 0
+        self.stopped = False
+        self.last_error = None
+        self.thread = threading.Thread(target=self._run, name="ExcelExporter", daemon=True)
+        self.thread.start()
+
+    def request_export(self):
+        with self.cond:
+            self.requested += 1
+            self.cond.notify_all()
+
+    def export_now(self):
+        records = self.journal.read_all()
+        date = records[-1].get("date") if records else None
+        if self.snapshot.pending and self.snapshot.date != date:
+            # Day rollover or reset: the workbook on disk still holds the old day, keep its copy current.
+            # A copy that can't be written (open in Excel) backs off like any other and never holds
+            # up the live workbook; the old day's rows stay in History/ either way.
+            self._write_snapshot()
+        write_excel(records, self.excel_path)
+        self.snapshot.mark(date, sum(1 for r in records if r.get("date") == date))
+
+    def _write_snapshot(self):
+        try:
+            self.snapshot.write(self.excel_path)
+        except Exception as e:
+            self.last_error = e
+            self.snapshot.failed()
+            metrics.count("daily_copy_failed")
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.exported == self.requested and not self.stopped:
+                    timeout = self.snapshot.seconds_until_due()
+                    if timeout == 0:
+                        break
+                    self.cond.wait(timeout)
+                if self.exported == self.requested and self.stopped:
+                    break
+                # Every request made so far is covered by this one export
+                target = self.requested
+            if target != self.exported:
+                try:
+                    with metrics.timed("workbook_export"):
+                        self.export_now()
+                    self.last_error = None
+                    notify(TOPIC_WORKBOOK)
+                except Exception as e:
+                    # Usually the workbook is open in Excel; retried on the next request
+                    self.last_error = e
+                    metrics.count("workbook_export_failed")
+                with self.cond:
+                    self.exported = target
+                    self.cond.notify_all()
+            if self.snapshot.due():
+                self._write_snapshot()
+        # Always leave a complete daily copy behind when the app closes
+        if self.snapshot.pending:
+            self._write_snapshot()
+
+    def flush(self, timeout=None):
+        with self.cond:
+            return self.cond.wait_for(lambda: self.exported == self.requested, timeout)
+
+    def close(self, timeout=10):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+        self.thread.join(timeout)
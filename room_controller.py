@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tkinter as tk
+from tkinter import messagebox
+from app_files import CONFIG_FOLDER
+from queue_engine import CandidateQueue, QueueEngine, JOURNAL_FILE, STATE_FILE, STATE_DB
+from change_notify import ChangeListener, TOPIC_JOURNAL
+from font_cache import pick_preferred_font
+import metrics
+
+# Constants
+ROOMS_CONFIG = os.path.join(CONFIG_FOLDER, "rooms.json")
+DEFAULT_ROOMS = ["Room 1", "Room 2"]
+REFRESH_INTERVAL = 3000  # ms, polling when change notifications are unavailable
+FALLBACK_INTERVAL = 15000  # ms, safety polling while change notifications are active
+WATCH_INTERVAL = 100  # ms, how often the Tk loop checks for a change notification
+
+# Dark theme colors
+BG_COLOR = "#121212"        # Very dark background
+FG_COLOR = "#00FFFF"        # Bright cyan text
+BUTTON_BG = "#1E1E1E"       # Dark button background
+BUTTON_FG = "#00FFFF"       # Bright button text
+DISABLED_BG = "#333333"
+DISABLED_FG = "#555555"
+RED_COLOR = "#FF5555"
+GREEN_COLOR = "#55FF55"
+
+# --- Today's candidates, read once per process and shared by every room it hosts ---
+class CandidateIndex(CandidateQueue):
+    def __init__(self, root, journal_file=JOURNAL_FILE):
+        # Candidates are queued per role; each room only gets the roles it interviews (config/routing.json)
+        super().__init__(journal_file)
+        self.root = root
+        self.missing_reported = False
+
+        # New registrations wake the rooms straight away; polling is only a fallback
+        self.listener = ChangeListener([TOPIC_JOURNAL])
+        self.poll_interval = FALLBACK_INTERVAL if self.listener.start() else REFRESH_INTERVAL
+        self.seen_version = self.listener.version
+        self.next_poll = 0
+
+    def refresh(self):
+        if not super().refresh():
+            if not self.missing_reported:
+                self.missing_reported = True
+                messagebox.showerror("Missing File", f"{self.journal_file} not found.")
+            return False
+        self.missing_reported = False
+        return True
+
+    def refresh_loop(self):
+        now = time.monotonic()
+        if self.listener.version != self.seen_version or now >= self.next_poll:
+            self.seen_version = self.listener.version
+            self.next_poll = now + self.poll_interval / 1000
+            self.refresh()
+        self.root.after(WATCH_INTERVAL, self.refresh_loop)
+
+class TokenCallerApp:
+    def __init__(self, master, counter_name, engine, font_family, position=0):
+        self.master = master
+        self.counter_name = counter_name
+        self.engine = engine
+        self.master.title(f"{counter_name} Control Panel")
+        # Rooms hosted together are tiled so their windows don't stack on top of each other
+        column, row = position % 4, position // 4
+        self.master.geometry(f"400x300+{20 + column * 420}+{20 + row * 330}")
+        self.master.configure(bg=BG_COLOR)
+
+        self.font_family = font_family
+
+        heading = tk.Label(master, text=counter_name, font=(self.font_family, 18, "bold"),
+                           bg=BG_COLOR, fg=FG_COLOR)
+        heading.pack(pady=5)
+
+        roles = engine.candidates.routing.rooms.get(counter_name)
+        if roles:
+            tk.Label(master, text="Interviews: " + ", ".join(roles), font=(self.font_family, 10),
+                     bg=BG_COLOR, fg=FG_COLOR).pack()
+
+        self.current_token = None
+        self.counter_closed = False
+
+        # Display window
+        self.display_window = tk.Toplevel(master)
+        self.display_window.title(f"{counter_name} Display")
+        self.display_window.geometry(f"300x200+{20 + column * 420}+{330 + row * 330}")
+        self.display_window.protocol("WM_DELETE_WINDOW", self.on_display_close)
+        self.display_window.configure(bg=BG_COLOR)
+
+        self.display_heading = tk.Label(self.display_window, text="KTech",
+                                        font=(self.font_family, 20, "bold"), fg=FG_COLOR, bg=BG_COLOR)
+        self.display_heading.pack(pady=(10, 5))
+
+        self.counter_heading = tk.Label(self.display_window, text=counter_name,
+                                        font=(self.font_family, 14, "bold"), fg=FG_COLOR, bg=BG_COLOR)
+        self.counter_heading.pack(pady=(0, 10))
+
+        self.display_label = tk.Label(self.display_window, text="Waiting...",
+                                      font=(self.font_family, 24, "bold"), fg=FG_COLOR, bg=BG_COLOR)
+        self.display_label.pack(expand=True)
+
+        # Control buttons
+        btn_style = {"font": (self.font_family, 14, "bold"),
+                     "bg": BUTTON_BG, "fg": BUTTON_FG,
+                     "activebackground": "#00AAAA", "activeforeground": "#000000"}
+
+        self.call_button = tk.Button(master, text="Call Next", command=self.call_next, **btn_style)
+        self.call_button.pack(pady=5, fill='x')
+
+        btn_style_sm = {"font": (self.font_family, 12, "bold"),
+                        "bg": BUTTON_BG, "fg": BUTTON_FG,
+                        "activebackground": "#00AAAA", "activeforeground": "#000000"}
+
+        self.recall_button = tk.Button(master, text="Recall", command=self.recall, **btn_style_sm)
+        self.recall_button.pack(pady=5, fill='x')
+
+        self.waiting_button = tk.Button(master, text="Waiting", command=self.set_waiting, **btn_style_sm)
+        self.waiting_button.pack(pady=5, fill='x')
+
+        self.close_button = tk.Button(master, text="Close Room", fg="white", bg=RED_COLOR,
+                                      command=self.close_counter, font=(self.font_family, 12, "bold"))
+        self.close_button.pack(pady=5, fill='x')
+
+        self.open_button = tk.Button(master, text="Open Room", fg="white", bg=GREEN_COLOR,
+                                     command=self.open_counter, font=(self.font_family, 12, "bold"))
+        self.open_button.pack(pady=5, fill='x')
+
+        self.token_label = tk.Label(master, text="Token: -\nName: -", font=(self.font_family, 14, "bold"),
+                                    fg=FG_COLOR, bg=BG_COLOR)
+        self.token_label.pack(pady=5)
+
+    def on_display_close(self):
+        messagebox.showinfo("Info", "Display window cannot be closed separately.")
+
+    def call_next(self):
+        if self.counter_closed:
+            messagebox.showwarning("Room Closed", "This room is closed.")
+            return
+
+        # Atomic across rooms: a token is handed to exactly one room
+        next_token = self.engine.call_next(self.counter_name)
+
+        if next_token:
+            self.current_token = next_token
+            self.update_display(next_token)
+        else:
+            messagebox.showinfo("Info", "No more tokens to call.")
+
+    def recall(self):
+        if self.counter_closed:
+            messagebox.showwarning("Room Closed", "This room is closed.")
+            return
+
+        if self.current_token:
+            self.update_display(self.current_token)
+        else:
+            messagebox.showinfo("Info", "No token to recall.")
+
+    def set_waiting(self):
+        if self.counter_closed:
+            messagebox.showwarning("Room Closed", "This room is closed.")
+            return
+
+        self.current_token = None
+        self.token_label.config(text="Waiting", fg=FG_COLOR)
+        self.display_label.config(text="Waiting", fg=FG_COLOR, font=(self.font_family, 24, "bold"))
+
+    def update_display(self, token_info):
+        token_text = f"Token: {token_info['token']}\nName: {token_info['name']}"
+        self.token_label.config(text=token_text, fg=FG_COLOR)
+        self.display_label.config(text=f"Token {token_info['token']}\n{token_info['name']}",
+                                  fg=FG_COLOR, font=(self.font_family, 24, "bold"))
+
+    def close_counter(self):
+        if messagebox.askyesno("Close Room", "Are you sure you want to close this interview room?"):
+            self.counter_closed = True
+            self.call_button.config(state='disabled', bg=DISABLED_BG, fg=DISABLED_FG)
+            self.recall_button.config(state='disabled', bg=DISABLED_BG, fg=DISABLED_FG)
+            self.waiting_button.config(state='disabled', bg=DISABLED_BG, fg=DISABLED_FG)
+            self.close_button.config(state='disabled', bg=DISABLED_BG, fg=DISABLED_FG)
+
+            self.display_label.config(text="Room Closed", fg=RED_COLOR, font=(self.font_family, 28, "bold"))
+            self.token_label.config(text="Room Closed", fg=RED_COLOR)
+
+    def open_counter(self):
+        if not self.counter_closed:
+            messagebox.showinfo("Info", "Room is already open.")
+            return
+
+        self.counter_closed = False
+        self.call_button.config(state='normal', bg=BUTTON_BG, fg=BUTTON_FG)
+        self.recall_button.config(state='normal', bg=BUTTON_BG, fg=BUTTON_FG)
+        self.waiting_button.config(state='normal', bg=BUTTON_BG, fg=BUTTON_FG)
+        self.close_button.config(state='normal', bg=RED_COLOR, fg="white")
+
+        self.current_token = None
+        self.token_label.config(text="Waiting", fg=FG_COLOR)
+        self.display_label.config(text="Waiting", fg=FG_COLOR, font=(self.font_family, 24, "bold"))
+
+
+# --- One process hosting any number of rooms ---
+def load_room_names(argv=None):
+    parser = argparse.ArgumentParser(description="Run the control panel and display of one or more interview rooms.")
+    parser.add_argument("rooms", nargs="*", help='room names, e.g. "Room 1" "Room 2"')
+    parser.add_argument("--count", type=int, help="run Room 1 .. Room N")
+    parser.add_argument("--config", default=ROOMS_CONFIG, help='JSON file like {"rooms": ["Room 1", "Room 2"]}')
+    args = parser.parse_args(argv)
+
+    if args.rooms:
+        return args.rooms
+    if args.count:
+        return [f"Room {i}" for i in range(1, args.count + 1)]
+    if os.path.exists(args.config):
+        with open(args.config, "r") as f:
+            rooms = json.load(f).get("rooms", [])
+        if rooms:
+            return rooms
+    return DEFAULT_ROOMS
+
+def run_rooms(room_names):
+    root = tk.Tk()
+    font_family = pick_preferred_font(root)
+    candidates = CandidateIndex(root)
+    engine = QueueEngine(candidates, state_db=STATE_DB, state_file=STATE_FILE)
+    # Earlier days are archived off the live database while the rooms are already taking calls
+    engine.store.compact_in_background()
+
+    # The first room uses the main window; closing it closes every room in this process
+    apps = []
+    for position, counter_name in enumerate(room_names):
+        master = root if position == 0 else tk.Toplevel(root)
+        if position > 0:
+            master.protocol("WM_DELETE_WINDOW", lambda: messagebox.showinfo(
+                "Info", f"Close the {room_names[0]} control panel to close all rooms."))
+        apps.append(TokenCallerApp(master, counter_name, engine, font_family, position))
+
+    candidates.refresh_loop()
+    root.mainloop()
+    engine.close()
+    return apps
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if "--archive" in argv:
+        # End of day for PCs that only have the packaged apps (ClearQueueJSON.bat runs
+        # "Interview Room 1.exe" --archive): archive today's calls and start over, no windows
+        import queue_store
+        sys.exit(queue_store.main(["--include-today"]))
+    metrics.configure("room")
+    run_rooms(load_room_names(argv))
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,351 @@
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+from datetime import datetime
+from app_files import CONFIG_FOLDER, JOURNAL_FILE
+from pending_queue import PendingQueue
+
+ROUTING_CONFIG = os.path.join(CONFIG_FOLDER, "routing.json")
+DEFAULT_ROLE = "General"
+DEFAULT_WEIGHT = 1
+DEFAULT_SERVICE_MINUTES = 10
+POLICIES = ["fifo", "wfq", "sew"]
+DEFAULT_POLICY = "wfq"
+SYNTHETIC_MINUTES = 480  # length of a synthetic interview day
+
+
+# --- Routing configuration: the roles candidates apply for and the roles each room interviews ---
+# config/routing.json:
+#   {"policy": "wfq",
+#    "roles": {"Developer": {"weight": 2, "service_minutes": 20}, "Designer": {"weight": 1, "service_minutes": 15}},
+#    "rooms": {"Room 1": ["Developer"], "Room 2": ["Developer", "Designer"]}}
+# Rooms that aren't listed interview every role. Without the file there is one role and plain FIFO.
+# Candidates whose role isn't in "roles" (registered before a config change, say) can go to any room,
+# so nobody waits for a queue that no room takes.
+class RoutingConfig:
+    def __init__(self, roles=None, rooms=None, policy=DEFAULT_POLICY):
+        self.roles = roles or {DEFAULT_ROLE: {}}
+        self.rooms = rooms or {}
+        self.policy = policy if policy in POLICIES else DEFAULT_POLICY
+
+    def role_names(self):
+        return list(self.roles)
+
+    def weight(self, role):
+        return max(float(self.roles.get(role, {}).get("weight", DEFAULT_WEIGHT)), 0.01)
+
+    def service_minutes(self, role):
+        return float(self.roles.get(role, {}).get("service_minutes", DEFAULT_SERVICE_MINUTES))
+
+    def accepts(self, room, role):
+        allowed = self.rooms.get(room)
+        return allowed is None or role in allowed or role not in self.roles
+
+    def check_role(self, role):
+        # The configured spelling of a candidate's role. With several roles configured, a missing
+        # or unknown role raises ValueError instead of opening a queue no room interviews.
+        role = str(role or "").strip()
+        if len(self.roles) <= 1:
+            return role or None
+        for name in self.roles:
+            if name.lower() == role.lower():
+                return name
+        if not role:
+            raise ValueError(f"A role is required: one of {', '.join(self.roles)}.")
+        raise ValueError(f"'{role}' is not a role in {ROUTING_CONFIG}: use one of {', '.join(self.roles)}.")
+
+    def rooms_for(self, role):
+        # Listed rooms that take this role; unlisted rooms are unknown here and not counted
+        return max(1, sum(1 for allowed in self.rooms.values() if role in allowed))
+
+
+def load_routing_config(path=ROUTING_CONFIG):
+    if not os.path.exists(path):
+        return RoutingConfig()
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    config = RoutingConfig(data.get("roles"), data.get("rooms"), data.get("policy", DEFAULT_POLICY))
+    # A misspelt role under "rooms" would leave that room idle while the role's candidates wait
+    for room, allowed in config.rooms.items():
+        unknown = [role for role in allowed if role not in config.roles]
+        if unknown:
+            raise ValueError(f"{path}: room '{room}' lists unknown role(s) {', '.join(unknown)}; "
+                             f"the roles are {', '.join(config.roles)}.")
+    return config
+
+
+def arrival_seconds(candidate):
+    if "arrival" in candidate:
+        return candidate["arrival"]
+    try:
+        return datetime.strptime(f"{candidate['date']} {candidate['time']}", "%Y-%m-%d %H:%M:%S").timestamp()
+    except (KeyError, TypeError, ValueError):
+        return 0
+
+
+# --- One pending queue per role; a room asks for its next candidate among the roles it interviews ---
+# Policies:
+#   fifo  earliest registration first, ignoring roles
+#   wfq   weighted fair queuing (self-clocked): each candidate gets a virtual finish tag on arrival,
+#         max(virtual time, role's last tag) + service / weight, and the smallest tag goes first.
+#         Tags only grow, so a role with a low weight is slowed down but never starved.
+#   sew   shortest expected wait: serve the role whose head candidate would wait longest if this room
+#         passed on them (time already waited + role backlog / rooms able to take it).
+#         The waited time keeps growing, so nobody is starved either.
+class RoleScheduler:
+    def __init__(self, config=None, policy=None):
+        self.config = config or RoutingConfig()
+        self.policy = policy or self.config.policy
+        self.queues = {}
+        self.role_of = {}
+        self.order = {}
+        self.arrival = {}
+        self.tags = {}
+        self.last_tag = {}
+        self.virtual_time = 0.0
+        self.called = set()
+        self.sequence = itertools.count()
+        self.epoch = None
+        self.seen_calls = 0
+        self.seen_moves = 0
+        self.newest = None
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    def __contains__(self, token):
+        role = self.role_of.get(token)
+        return role is not None and token in self.queues[role]
+
+    def add(self, candidate):
+        token = candidate["token"]
+        if token in self.role_of:
+            return False
+        role = candidate.get("role") or DEFAULT_ROLE
+        self.role_of[token] = role
+        self.order[token] = next(self.sequence)
+        self.arrival[token] = arrival_seconds(candidate)
+        start = max(self.virtual_time, self.last_tag.get(role, 0.0))
+        self.tags[token] = self.last_tag[role] = start + self.config.service_minutes(role) / self.config.weight(role)
+
+        queue = self.queues.get(role)
+        if queue is None:
+            queue = self.queues[role] = PendingQueue()
+        # Every role's queue is keyed by the shared arrival order, so positions compare across roles
+        queue.add(candidate, self.order[token])
+        self.newest = token
+        if token in self.called:
+            queue.mark_called(token)
+        return True
+
+    def add_many(self, candidates):
+        for candidate in candidates:
+            self.add(candidate)
+
+    def next_for(self, counter, now=None):
+        heads = []
+        for role, queue in self.queues.items():
+            if not self.config.accepts(counter, role):
+                continue
+            head = queue.peek()
+            if head is not None:
+                heads.append((role, head))
+        if not heads:
+            return None
+        return self._pick(heads, now)[1]
+
+    def _pick(self, heads, now=None, backlog=None):
+        # heads: (role, candidate) at the front of each role's queue; backlog: waiting per role
+        if self.policy == "fifo":
+            # Queue keys follow arrival order and carry skips and requeues to the front
+            return min(heads, key=lambda h: self.queues[h[0]].positions[h[1]["token"]])
+        if self.policy == "wfq":
+            return min(heads, key=lambda h: (self.tags[h[1]["token"]], self.order[h[1]["token"]]))
+
+        now = datetime.now().timestamp() if now is None else now
+
+        def expected_wait(item):
+            role, head = item
+            waiting = len(self.queues[role]) if backlog is None else backlog[role]
+            backlog_seconds = waiting * self.config.service_minutes(role) * 60
+            return now - self.arrival[head["token"]] + backlog_seconds / self.config.rooms_for(role)
+        return max(heads, key=expected_wait)
+
+    def first(self, count):
+        # The next `count` candidates across all roles in the order next_for hands them out to rooms
+        # taking every role: each role's queue in its own order, merged by the policy
+        lists = {role: queue.first(count) for role, queue in self.queues.items()}
+        taken = dict.fromkeys(lists, 0)
+        backlog = {role: len(self.queues[role]) for role in lists}
+        now = datetime.now().timestamp()
+        result = []
+        while len(result) < count:
+            heads = [(role, lists[role][taken[role]]) for role in lists if taken[role] < len(lists[role])]
+            if not heads:
+                break
+            role, head = self._pick(heads, now, backlog)
+            result.append(head)
+            taken[role] += 1
+            backlog[role] -= 1
+        return result
+
+    def mark_called(self, token):
+        self.called.add(token)
+        role = self.role_of.get(token)
+        if role is not None:
+            self.queues[role].mark_called(token)
+            self.virtual_time = max(self.virtual_time, self.tags[token])
+
+    def move(self, token, move, after=None):
+        role = self.role_of.get(token)
+        if role is None:
+            return False
+        if move == "front":
+            return self.queues[role].move(token, move)
+        return self.queues[role].place(token, self.order.get(self.newest if after is None else after))
+
+    def apply_calls(self, epoch, called_log, moves=()):
+        # Same contract as PendingQueue.apply_calls: catch up with calls and moves made by any room
+        if epoch != self.epoch:
+            self.epoch = epoch
+            self.seen_calls = 0
+            self.seen_moves = 0
+            for token in self.called:
+                role = self.role_of.get(token)
+                if role is not None:
+                    self.queues[role].requeue(token)
+            self.called = set()
+        for token in called_log[self.seen_calls:]:
+            self.mark_called(token)
+        self.seen_calls = len(called_log)
+        for token, move, after in moves[self.seen_moves:]:
+            self.move(token, move, after)
+        self.seen_moves = len(moves)
+
+    def clear(self):
+        self.__init__(self.config, self.policy)
+
+
+# --- Simulation: replay arrivals through each policy and compare candidate waits ---
+def synthetic_arrivals(config, count, minutes=SYNTHETIC_MINUTES, seed=1):
+    rng = random.Random(seed)
+    roles = config.role_names()
+    weights = [config.weight(role) for role in roles]
+    times = sorted(rng.uniform(0, minutes * 60) for _ in range(count))
+    return [{"token": i + 1, "role": rng.choices(roles, weights)[0], "arrival": t} for i, t in enumerate(times)]
+
+
+def recorded_arrivals(journal_file=JOURNAL_FILE, date=None):
+    records = []
+    with open(journal_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    date = date or (records[-1].get("date") if records else None)
+    arrivals = []
+    for record in records:
+        if record.get("date") != date:
+            continue
+        arrivals.append({"token": record.get("entry_no"), "role": record.get("role") or DEFAULT_ROLE,
+                         "date": record.get("date"), "time": record.get("time")})
+    start = min((arrival_seconds(a) for a in arrivals), default=0)
+    for arrival in arrivals:
+        arrival["arrival"] = arrival_seconds(arrival) - start
+    return arrivals
+
+
+def simulate(arrivals, config, policy, rooms, seed=1):
+    # Service times are drawn once per candidate (exponential around the role's average),
+    # so every policy is compared on exactly the same day
+    rng = random.Random(seed)
+    service = {a["token"]: rng.expovariate(1 / (config.service_minutes(a["role"]) * 60)) for a in arrivals}
+    scheduler = RoleScheduler(config, policy)
+    pending = sorted(arrivals, key=lambda a: a["arrival"])
+    busy = []   # (free at, room)
+    idle = list(rooms)
+    waits = {}
+    i = 0
+    now = 0.0
+    while i < len(pending) or busy:
+        next_arrival = pending[i]["arrival"] if i < len(pending) else float("inf")
+        next_free = busy[0][0] if busy else float("inf")
+        if next_arrival <= next_free:
+            now = next_arrival
+            scheduler.add(pending[i])
+            i += 1
+        else:
+            now, room = heapq.heappop(busy)
+            idle.append(room)
+        for room in list(idle):
+            candidate = scheduler.next_for(room, now)
+            if candidate is None:
+                continue
+            scheduler.mark_called(candidate["token"])
+            waits[candidate["token"]] = (candidate["role"], now - candidate["arrival"])
+            idle.remove(room)
+            heapq.heappush(busy, (now + service[candidate["token"]], room))
+    return waits
+
+
+def summarize_waits(waits, served_total):
+    minutes = sorted(wait / 60 for _, wait in waits.values())
+    if not minutes:
+        return {"served": 0, "unserved": served_total}
+    by_role = {}
+    for role, wait in waits.values():
+        by_role.setdefault(role, []).append(wait / 60)
+    return {
+        "served": len(minutes),
+        "unserved": served_total - len(minutes),
+        "mean": statistics.mean(minutes),
+        "p95": minutes[min(len(minutes) - 1, int(len(minutes) * 0.95))],
+        "max": minutes[-1],
+        "by_role": {role: statistics.mean(values) for role, values in sorted(by_role.items())},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare room routing policies on recorded or synthetic arrivals.")
+    parser.add_argument("--config", default=ROUTING_CONFIG, help="routing config (roles, weights, room roles)")
+    parser.add_argument("--journal", help="replay a recorded day from this journal (default: synthetic arrivals)")
+    parser.add_argument("--date", help="day to replay from the journal (default: the last day in it)")
+    parser.add_argument("--synthetic", type=int, help="number of synthetic candidates (default: enough to keep the rooms 90%% busy)")
+    parser.add_argument("--rooms", nargs="*", help="rooms to simulate (default: the rooms in the config, or 2)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    config = load_routing_config(args.config)
+    rooms = args.rooms or list(config.rooms) or ["Room 1", "Room 2"]
+    if args.journal:
+        arrivals = recorded_arrivals(args.journal, args.date)
+    else:
+        roles = config.role_names()
+        weights = [config.weight(role) for role in roles]
+        average_service = sum(w * config.service_minutes(r) for r, w in zip(roles, weights)) / sum(weights)
+        count = args.synthetic or int(0.9 * len(rooms) * SYNTHETIC_MINUTES / average_service)
+        arrivals = synthetic_arrivals(config, count, SYNTHETIC_MINUTES, args.seed)
+    if not arrivals:
+        print("No arrivals to simulate.", file=sys.stderr)
+        return 1
+
+    print(f"{len(arrivals)} candidates, rooms: {', '.join(rooms)}")
+    print(f"{'policy':<6} {'mean':>7} {'p95':>7} {'max':>7}  mean wait per role (minutes)")
+    for policy in POLICIES:
+        result = summarize_waits(simulate(arrivals, config, policy, rooms, args.seed), len(arrivals))
+        if not result["served"]:
+            print(f"{policy:<6} no candidate could be served by these rooms")
+            continue
+        roles = ", ".join(f"{role} {mean:.1f}" for role, mean in result["by_role"].items())
+        unserved = f"  ({result['unserved']} never served: no room takes their role)" if result["unserved"] else ""
+        print(f"{policy:<6} {result['mean']:7.1f} {result['p95']:7.1f} {result['max']:7.1f}  {roles}{unserved}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+import os
+import sys
+
+# --- WAL only on a local disk ---
+# In WAL mode readers and writers share an index (the -shm file) through shared memory, which doesn't
+# work between PCs over a network share. There the databases use the rollback journal instead:
+# commits are slower, but every PC sees the same data and locks.
+NETWORK_FILESYSTEMS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "9p", "afs"}
+DRIVE_REMOTE = 4  # GetDriveTypeW result for a mapped network drive
+
+_modes = {}
+
+
+def on_network_share(path):
+    path = os.path.abspath(path)
+    if sys.platform == "win32":
+        if path.startswith("\\\\"):
+            return True
+        import ctypes
+        drive = os.path.splitdrive(path)[0] + "\\"
+        return ctypes.windll.kernel32.GetDriveTypeW(drive) == DRIVE_REMOTE
+    # Longest mount point in /proc/mounts that holds the path (no /proc, e.g. macOS: treated as local)
+    best, fs_type = "", None
+    try:
+        with open("/proc/mounts", "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mount = parts[1].replace("\\040", " ")
+                inside = path == mount or path.startswith(mount.rstrip("/") + "/")
+                if inside and len(mount) > len(best):
+                    best, fs_type = mount, parts[2]
+    except OSError:
+        return False
+    return fs_type in NETWORK_FILESYSTEMS
+
+
+def journal_mode(db_path):
+    # Looked up once per folder
+    folder = os.path.dirname(os.path.abspath(db_path))
+    mode = _modes.get(folder)
+    if mode is None:
+        mode = _modes[folder] = "DELETE" if on_network_share(folder) else "WAL"
+    return mode
+
+
+def set_journal_mode(conn, db_path):
+    conn.execute(f"PRAGMA journal_mode={journal_mode(db_path)}")
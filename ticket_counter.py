@@ -0,0 +1,120 @@
+import json
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from app_files import COUNTER_DB, today_str
+from sqlite_mode import set_journal_mode
+
+
+# --- Persisted daily entry-number counter shared by every reception desk ---
+class TicketCounter:
+    def __init__(self, db_path=COUNTER_DB, desk="", block_size=0):
+        folder = os.path.dirname(db_path) or "."
+        os.makedirs(folder, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        set_journal_mode(self.conn, db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS counters (
+                day TEXT PRIMARY KEY,
+                last_no INTEGER NOT NULL,
+                generation INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+
+        # Block mode: this desk takes block_size numbers at a time and hands them out locally
+        self.desk = desk
+        self.block_size = block_size
+        self.block = None
+        self.block_file = None
+        if block_size:
+            safe_desk = re.sub(r"[^A-Za-z0-9_-]+", "_", desk) or "desk"
+            self.block_file = os.path.join(folder, f"desk_block_{safe_desk}.json")
+            self.block = self._load_block()
+
+    @contextmanager
+    def transaction(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def _row(self, day):
+        return self.conn.execute("SELECT last_no, generation FROM counters WHERE day = ?", (day,)).fetchone()
+
+    def seed(self, last_no_fn):
+        # One-time recovery for a day the counter has never seen (e.g. upgrading mid-day)
+        day = today_str()
+        if self._row(day) is None:
+            with self.transaction():
+                self.conn.execute("INSERT OR IGNORE INTO counters (day, last_no) VALUES (?, ?)", (day, last_no_fn()))
+
+    def _advance(self, count):
+        day = today_str()
+        with self.transaction():
+            self.conn.execute("INSERT OR IGNORE INTO counters (day, last_no) VALUES (?, 0)", (day,))
+            self.conn.execute("UPDATE counters SET last_no = last_no + ? WHERE day = ?", (count, day))
+            last_no, generation = self._row(day)
+        return last_no - count + 1, generation
+
+    def take(self, count):
+        # Reserves `count` consecutive numbers atomically and returns the first one
+        first, _ = self._advance(count)
+        return first
+
+    def _block_valid(self, day):
+        if self.block is None or self.block["day"] != day:
+            return False
+        row = self._row(day)
+        # A reset from any desk bumps the generation and retires every handed-out block
+        return row is not None and row[1] == self.block["generation"]
+
+    def next_number(self):
+        if not self.block_size:
+            return self.take(1)
+        day = today_str()
+        if not self._block_valid(day) or self.block["next"] > self.block["end"]:
+            first, generation = self._advance(self.block_size)
+            self.block = {"day": day, "generation": generation, "next": first,
+                          "end": first + self.block_size - 1, "last": 0}
+        number = self.block["next"]
+        self.block["next"] += 1
+        self.block["last"] = number
+        self._save_block()
+        return number
+
+    def current(self):
+        # Last number handed out today: by this desk in block mode, by any desk otherwise
+        day = today_str()
+        if self.block_size:
+            return self.block["last"] if self._block_valid(day) else 0
+        row = self._row(day)
+        return row[0] if row else 0
+
+    def reset(self):
+        day = today_str()
+        with self.transaction():
+            self.conn.execute("INSERT OR IGNORE INTO counters (day, last_no) VALUES (?, 0)", (day,))
+            self.conn.execute("UPDATE counters SET last_no = 0, generation = generation + 1 WHERE day = ?", (day,))
+        self.block = None
+        if self.block_file and os.path.exists(self.block_file):
+            os.remove(self.block_file)
+
+    def _load_block(self):
+        try:
+            with open(self.block_file, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_block(self):
+        tmp_path = self.block_file + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.block, f)
+        os.replace(tmp_path, self.block_file)
+
+    def close(self):
+        self.conn.close()
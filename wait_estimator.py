@@ -0,0 +1,163 @@
+from collections import deque
+from datetime import datetime
+
+DEFAULT_SERVICE_SECONDS = 600  # assumed interview length until a room has been timed
+EWMA_ALPHA = 0.3  # weight of the newest interval in the running average
+SAMPLE_WINDOW = 50  # recent intervals per room kept for percentiles
+MAX_INTERVAL = 45 * 60  # longer gaps are breaks, not interviews
+ACTIVE_WINDOW = 45 * 60  # rooms that haven't called for this long don't count towards throughput
+UPCOMING = 5  # next tokens published with their ETA for the Central Display
+
+
+def parse_timestamp(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+# --- Interview length per room, learned from the time between its calls ---
+class RoomTimer:
+    def __init__(self):
+        self.last_call = None
+        self.average = None
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+        self.calls = 0
+
+    def observe(self, when):
+        self.calls += 1
+        if self.last_call is not None:
+            interval = when - self.last_call
+            if 0 < interval <= MAX_INTERVAL:
+                self.samples.append(interval)
+                if self.average is None:
+                    self.average = interval
+                else:
+                    self.average = EWMA_ALPHA * interval + (1 - EWMA_ALPHA) * self.average
+        self.last_call = when
+
+    def stats(self):
+        ordered = sorted(self.samples)
+        return {
+            "calls": self.calls,
+            "avg_seconds": round(self.average) if self.average is not None else None,
+            "p50_seconds": percentile(ordered, 0.5),
+            "p90_seconds": percentile(ordered, 0.9),
+        }
+
+
+# --- Called tokens in a Fenwick tree, so "how many are still ahead of token N" is O(log n) ---
+class CalledRank:
+    def __init__(self):
+        self.tree = [0] * 1025
+        self.count = 0
+        self.tokens = set()
+
+    def add(self, token):
+        if not isinstance(token, int) or token < 1 or token in self.tokens:
+            return
+        while token >= len(self.tree):
+            self._grow()
+        self.tokens.add(token)
+        self.count += 1
+        i = token
+        while i < len(self.tree):
+            self.tree[i] += 1
+            i += i & -i
+
+    def _grow(self):
+        tokens = self.tokens
+        self.tree = [0] * (len(self.tree) * 2 - 1)
+        self.tokens = set()
+        self.count = 0
+        for token in tokens:
+            self.add(token)
+
+    def called_before(self, token):
+        i = min(token - 1, len(self.tree) - 1)
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+
+# --- ETAs for waiting tokens; fed one call at a time, never rebuilt from the whole day ---
+class WaitEstimator:
+    def __init__(self):
+        self.rooms = {}
+        self.called = CalledRank()
+        self.latest = None
+
+    def observe_call(self, counter, token, timestamp):
+        when = parse_timestamp(timestamp)
+        self.called.add(token)
+        if when is None:
+            return
+        timer = self.rooms.get(counter)
+        if timer is None:
+            timer = self.rooms[counter] = RoomTimer()
+        timer.observe(when)
+        self.latest = when if self.latest is None else max(self.latest, when)
+
+    def seconds_per_call(self, now=None, p90=False):
+        # Time between calls with every active room working in parallel
+        now = self.latest if now is None else now
+        rate = 0.0
+        for timer in self.rooms.values():
+            if now is not None and timer.last_call is not None and now - timer.last_call > ACTIVE_WINDOW:
+                continue
+            seconds = percentile(sorted(timer.samples), 0.9) if p90 else timer.average
+            rate += 1 / (seconds or DEFAULT_SERVICE_SECONDS)
+        return 1 / rate if rate else DEFAULT_SERVICE_SECONDS
+
+    def ahead_of(self, token):
+        # Waiting tokens with a smaller number (tokens are called roughly in entry order)
+        return max(0, token - 1 - self.called.called_before(token))
+
+    def eta_seconds(self, token, now=None, p90=False):
+        if token in self.called.tokens:
+            return None
+        return (self.ahead_of(token) + 1) * self.seconds_per_call(now, p90)
+
+    def summary(self, upcoming=()):
+        # Published in queue_state.json; upcoming: the next waiting candidates in call order
+        per_call = self.seconds_per_call()
+        per_call_p90 = self.seconds_per_call(p90=True)
+        return {
+            "updated": datetime.fromtimestamp(self.latest).isoformat(timespec="seconds") if self.latest else None,
+            "called": self.called.count,
+            "seconds_per_call": round(per_call),
+            "p90_seconds_per_call": round(per_call_p90),
+            "rooms": {counter: timer.stats() for counter, timer in self.rooms.items()},
+            "upcoming": [
+                {"token": c["token"], "name": c.get("name"),
+                 "eta_seconds": round((i + 1) * per_call), "eta_p90_seconds": round((i + 1) * per_call_p90)}
+                for i, c in enumerate(upcoming)
+            ],
+        }
+
+
+def eta_from_summary(summary, entry_no):
+    # For apps that only see queue_state.json (e.g. the POS printing a new pass)
+    if not summary:
+        return None
+    ahead = max(0, entry_no - 1 - summary.get("called", 0))
+    return (ahead + 1) * summary.get("seconds_per_call", DEFAULT_SERVICE_SECONDS)
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return ""
+    minutes = max(1, round(seconds / 60))
+    if minutes < 60:
+        return f"~{minutes} min"
+    return f"~{minutes // 60} h {minutes % 60:02d} min"